@@ -1,7 +1,7 @@
 import argparse
 import time
 
-from src import trading
+from src import janitor, trading
 
 try:
     import schedule
@@ -34,6 +34,7 @@ def run_scheduler(sched: schedule.Scheduler, *, once: bool = False) -> None:
 
     while True:
         sched.run_pending()
+        janitor.idle_prune()
         time.sleep(60)
 
 
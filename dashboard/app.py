@@ -9,14 +9,12 @@ from flask import (
 )
 import pandas as pd
 import yaml
-from dotenv import dotenv_values
 from pathlib import Path
 from flask_login import login_required
 from .auth import auth_bp, login_manager
 
 from threading import Thread, Event
 import time
-import daily_run
 import shutil
 import io
 from datetime import datetime
@@ -27,9 +25,12 @@ import json
 from . import audit
 from .audit import record_change
 
-from src import bot_status
-from src.generate_graph import generate_graph
+from src import bot_status, janitor, settings, watcher
+from src.generate_graph import read_manifest, update_graph
 from src.portfolio import Portfolio
+from src.portfolio.journal import read_trades
+from src.portfolio.ledger import get_ledger
+from src.portfolio.pnl import get_engine
 import builtins
 from datetime import datetime
 
@@ -59,6 +60,7 @@ def _scheduler_loop(sched: 'schedule.Scheduler', stop_event: Event) -> None:
     """Run pending jobs until ``stop_event`` is set."""
     while not stop_event.is_set():
         sched.run_pending()
+        janitor.idle_prune(CONFIG_FILE)
         time.sleep(60)
 
 
@@ -67,11 +69,11 @@ def start_scheduler(run_time: str | None = None) -> None:
     global _scheduler_thread, _scheduler_event
 
     if run_time is None:
-        run_time = "09:00"
-        if CONFIG_FILE.exists():
-            with open(CONFIG_FILE) as f:
-                cfg = yaml.safe_load(f) or {}
-                run_time = cfg.get("run_time", run_time)
+        run_time = settings.config(CONFIG_FILE).get_str("run_time", "09:00")
+
+    # daily_run pulls in ``schedule`` and the trading stack; load it only
+    # once a scheduler is actually started
+    import daily_run
 
     stop_event = Event()
     sched = daily_run.build_daily_scheduler(
@@ -82,6 +84,11 @@ def start_scheduler(run_time: str | None = None) -> None:
     _scheduler_event = stop_event
     thread.start()
 
+    # Intraday stop-loss checks stop together with the scheduler
+    interval = watcher.load_interval(CONFIG_FILE)
+    if interval > 0:
+        watcher.start(interval, stop_event)
+
 
 def stop_scheduler() -> None:
     """Stop the running scheduler thread if active."""
@@ -147,19 +154,21 @@ def show_log():
     file_path = next((p for p in file_candidates if p.exists()), None)
     if not file_path:
         return "Trade log not found", 404
-    df = pd.read_csv(file_path)
+    df = read_trades(file_path, limit=request.args.get("limit", type=int))
     table = df.to_html(index=False, classes="table table-striped")
     return render_template("log.html", table=table)
 
 @app.route("/graph_image")
 def graph_image():
     GRAPH_DIR.mkdir(exist_ok=True)
+    manifest = read_manifest(GRAPH_DIR)
+    if manifest is not None:
+        return send_file(GRAPH_DIR / manifest["file"], mimetype="image/png")
     png_files = list(GRAPH_DIR.glob("*.png"))
     if png_files:
         latest = max(png_files, key=lambda p: p.stat().st_mtime)
     else:
-        latest = GRAPH_DIR / "performance.png"
-        generate_graph(latest.as_posix(), show=False)
+        latest, _ = update_graph(GRAPH_DIR, "performance.png")
     return send_file(latest, mimetype="image/png")
 
 
@@ -168,6 +177,12 @@ def show_graph():
     return render_template("graph.html")
 
 
+def _pnl_engine():
+    """Return the PnL engine for the trade log, caught up with new trades."""
+    method = settings.config(CONFIG_FILE).get_str("pnl_method")
+    return get_engine(CSV_DIR / "chatgpt_trade_log.csv", method)
+
+
 @app.route("/summary")
 def show_summary():
     file_path = CSV_DIR / "chatgpt_portfolio_update.csv"
@@ -178,6 +193,7 @@ def show_summary():
     if totals.empty:
         return "No summary data", 404
     latest = totals.iloc[-1]
+    engine = _pnl_engine()
     return render_template(
         "summary.html",
         date=latest["Date"],
@@ -185,6 +201,9 @@ def show_summary():
         pnl=latest["PnL"],
         cash=latest["Cash Balance"],
         equity=latest["Total Equity"],
+        realized=round(engine.realized, 2),
+        unrealized=round(engine.unrealized, 2),
+        tickers=engine.frame().to_dict("records"),
     )
 
 
@@ -199,6 +218,7 @@ def overview():
     if totals.empty:
         return "No summary data", 404
     latest = totals.iloc[-1]
+    engine = _pnl_engine()
     return render_template(
         "overview.html",
         date=latest["Date"],
@@ -206,6 +226,8 @@ def overview():
         pnl=latest["PnL"],
         cash=latest["Cash Balance"],
         equity=latest["Total Equity"],
+        realized=round(engine.realized, 2),
+        unrealized=round(engine.unrealized, 2),
     )
 
 
@@ -224,23 +246,26 @@ def config_page():
         tickers_raw = form.get("extra_tickers", "")
         tickers = [t.strip() for t in tickers_raw.split(",") if t.strip()]
 
-        config_data = {
+        config_data = settings.config(CONFIG_FILE).as_dict()
+        config_data.update({
             "default_cash": default_cash,
             "default_stop_loss": default_stop,
             "extra_tickers": tickers,
             "email": form.get("email", ""),
             "webhook_url": form.get("webhook_url", ""),
-        }
+        })
         with open(CONFIG_FILE, "w") as f:
             yaml.safe_dump(config_data, f)
+        settings.config(CONFIG_FILE).invalidate()
 
-        env_vals = dotenv_values(ENV_FILE)
+        env_vals = settings.env(ENV_FILE).as_dict()
         env_vals["BROKER_API_KEY"] = form.get("BROKER_API_KEY", "")
         env_vals["BROKER_SECRET_KEY"] = form.get("BROKER_SECRET_KEY", "")
         env_vals["BROKER_BASE_URL"] = form.get("BROKER_BASE_URL", "")
         with open(ENV_FILE, "w") as f:
             for k, v in env_vals.items():
                 f.write(f"{k}={v}\n")
+        settings.env(ENV_FILE).invalidate()
 
         record_change(
             user=request.remote_addr or "unknown",
@@ -250,29 +275,24 @@ def config_page():
 
         return redirect(url_for("config_page"))
 
-    cfg = {}
-    if CONFIG_FILE.exists():
-        with open(CONFIG_FILE) as f:
-            cfg = yaml.safe_load(f) or {}
-    env = dotenv_values(ENV_FILE)
+    cfg = settings.config(CONFIG_FILE).data
+    env = settings.env(ENV_FILE).data
     return render_template("config.html", config=cfg, env=env)
 
 
 @app.route("/scheduler", methods=["GET", "POST"])
 def scheduler_page():
     """View and update the daily scheduler run time."""
-    run_time = "09:00"
-    cfg = {}
-    if CONFIG_FILE.exists():
-        with open(CONFIG_FILE) as f:
-            cfg = yaml.safe_load(f) or {}
-            run_time = cfg.get("run_time", run_time)
+    config = settings.config(CONFIG_FILE)
+    run_time = config.get_str("run_time", "09:00")
 
     if request.method == "POST":
         run_time = request.form.get("run_time", run_time)
+        cfg = config.as_dict()
         cfg["run_time"] = run_time
         with open(CONFIG_FILE, "w") as f:
             yaml.safe_dump(cfg, f)
+        config.invalidate()
         restart_scheduler(run_time)
         return redirect(url_for("scheduler_page"))
 
@@ -294,43 +314,25 @@ def manual_buy():
         pf_file = CSV_DIR / "chatgpt_portfolio_update.csv"
         if not pf_file.exists():
             return "Portfolio file not found", 404
-        df = pd.read_csv(pf_file)
-        latest_date = df["Date"].max()
-        current = df[df["Date"] == latest_date].copy()
-        cash = 0.0
-        if not current.empty:
-            cash_row = current[current["Ticker"] == "TOTAL"]
-            if not cash_row.empty:
-                cash = float(cash_row["Cash Balance"].iloc[0])
-            current = current[current["Ticker"] != "TOTAL"]
-
-        current = current.rename(
-            columns={
-                "Ticker": "ticker",
-                "Shares": "shares",
-                "Stop Loss": "stop_loss",
-                "Cost Basis": "buy_price",
-            }
-        )
-        if not current.empty:
-            current["cost_basis"] = current["buy_price"] * current["shares"]
+        ledger = get_ledger(pf_file)
 
         portfolio_obj = Portfolio(today=datetime.today().strftime("%Y-%m-%d"))
         old_input = builtins.input
         builtins.input = lambda *a, **k: "0"
         try:
-            cash, updated = portfolio_obj.log_manual_buy(
+            cash, portfolio = portfolio_obj.log_manual_buy(
                 price,
                 shares,
                 ticker,
-                cash,
+                ledger.cash,
                 stop,
-                current,
+                ledger.to_frame(),
             )
         finally:
             builtins.input = old_input
 
-        portfolio_obj.process(updated, cash)
+        # The shared ledger is replaced once the day has been written
+        portfolio_obj.process(portfolio, cash)
         return redirect(url_for("show_portfolio"))
 
     return render_template("manual_buy.html")
@@ -351,37 +353,18 @@ def manual_sell():
         pf_file = CSV_DIR / "chatgpt_portfolio_update.csv"
         if not pf_file.exists():
             return "Portfolio file not found", 404
-        df = pd.read_csv(pf_file)
-        latest_date = df["Date"].max()
-        current = df[df["Date"] == latest_date].copy()
-        cash = 0.0
-        if not current.empty:
-            cash_row = current[current["Ticker"] == "TOTAL"]
-            if not cash_row.empty:
-                cash = float(cash_row["Cash Balance"].iloc[0])
-            current = current[current["Ticker"] != "TOTAL"]
-
-        current = current.rename(
-            columns={
-                "Ticker": "ticker",
-                "Shares": "shares",
-                "Stop Loss": "stop_loss",
-                "Cost Basis": "buy_price",
-            }
-        )
-        if not current.empty:
-            current["cost_basis"] = current["buy_price"] * current["shares"]
+        ledger = get_ledger(pf_file)
 
         portfolio_obj = Portfolio(today=datetime.today().strftime("%Y-%m-%d"))
         old_input = builtins.input
         builtins.input = lambda *a, **k: "web"
         try:
-            cash, updated = portfolio_obj.log_manual_sell(
+            cash, portfolio = portfolio_obj.log_manual_sell(
                 price,
                 shares,
                 ticker,
-                cash,
-                current,
+                ledger.cash,
+                ledger.to_frame(),
             )
         except (KeyError, ValueError) as exc:
             builtins.input = old_input
@@ -389,7 +372,8 @@ def manual_sell():
         finally:
             builtins.input = old_input
 
-        portfolio_obj.process(updated, cash)
+        # The shared ledger is replaced once the day has been written
+        portfolio_obj.process(portfolio, cash)
         return redirect(url_for("show_portfolio"))
 
     return render_template("manual_sell.html")
@@ -9,7 +9,8 @@ from flask_login import (
     login_required,
     UserMixin,
 )
-from dotenv import dotenv_values
+
+from src import settings
 
 BASE_DIR = Path(__file__).resolve().parents[1]
 ENV_FILE = BASE_DIR / ".env"
@@ -22,8 +23,8 @@ auth_bp = Blueprint("auth", __name__)
 
 
 def _load_credentials() -> tuple[str | None, str | None]:
-    env = dotenv_values(ENV_FILE)
-    return env.get("DASHBOARD_USERNAME"), env.get("DASHBOARD_PASSWORD")
+    env = settings.env(ENV_FILE)
+    return env.get_str("DASHBOARD_USERNAME"), env.get_str("DASHBOARD_PASSWORD")
 
 
 class User(UserMixin):
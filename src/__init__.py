@@ -7,5 +7,14 @@ __all__ = [
     "trading",
     "generate_graph",
     "cache",
+    "providers",
+    "janitor",
+    "price_matrix",
     "notifications",
+    "watcher",
+    "timing",
+    "price_context",
+    "backtest",
+    "sweep",
+    "settings",
 ]
@@ -0,0 +1,146 @@
+"""Vectorized backtest of the daily stop-loss strategy.
+
+Replays what :meth:`Portfolio.process` does every day -- hold each position
+until its close falls to the stop loss, then sell it at that close -- over a
+range of cached daily closes.  All days are evaluated at once as array
+operations instead of running the daily update once per day.
+"""
+
+from __future__ import annotations
+
+import argparse
+from typing import Dict, Iterable, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .cache import get_price_data_many
+
+
+def simulate(
+    closes: np.ndarray,
+    shares: np.ndarray,
+    buy_price: np.ndarray,
+    stop_loss: np.ndarray,
+    cash: float,
+) -> Dict[str, np.ndarray]:
+    """Run the stop-loss strategy over ``closes`` (days x positions).
+
+    Missing closes (``NaN``) count as no price that day: the position is
+    neither valued nor sold.  Returns per-day ``value``, ``pnl``, ``cash``
+    and ``equity`` arrays plus ``sold_day`` per position (the number of
+    days when it was never sold) and the ``proceeds`` of each sale.
+    """
+    days = closes.shape[0]
+    price = np.round(closes, 2)
+    with np.errstate(invalid="ignore"):
+        breach = price <= stop_loss
+    sold = breach.any(axis=0)
+    sold_day = np.where(sold, breach.argmax(axis=0), days)
+
+    held = np.arange(days)[:, None] < sold_day
+    priced = held & ~np.isnan(price)
+    value = np.round(price * shares, 2)
+    pnl = np.round((price - buy_price) * shares, 2)
+
+    cols = np.flatnonzero(sold)
+    proceeds = np.zeros(len(shares))
+    proceeds[cols] = value[sold_day[cols], cols]
+    sales = np.zeros(days)
+    np.add.at(sales, sold_day[cols], proceeds[cols])
+    cash_by_day = cash + np.cumsum(sales)
+
+    total_value = np.where(priced, value, 0.0).sum(axis=1)
+    return {
+        "value": total_value,
+        "pnl": np.where(priced, pnl, 0.0).sum(axis=1),
+        "cash": cash_by_day,
+        "equity": total_value + cash_by_day,
+        "sold_day": sold_day,
+        "proceeds": proceeds,
+    }
+
+
+def load_closes(tickers: Iterable[str], start: str, end: str) -> pd.DataFrame:
+    """Return cached daily closes (dates x tickers) from ``start`` to ``end`` inclusive."""
+    tickers = list(dict.fromkeys(tickers))
+    frames = get_price_data_many(tickers, start=start, end=pd.Timestamp(end) + pd.Timedelta(days=1))
+    closes = pd.DataFrame(
+        {t: frames[t]["Close"] if "Close" in frames[t] else pd.Series(dtype=float) for t in tickers}
+    )
+    closes.index.name = "Date"
+    return closes.sort_index().ffill()
+
+
+def backtest(
+    portfolio: pd.DataFrame,
+    cash: float,
+    start: str,
+    end: str,
+    closes: pd.DataFrame | None = None,
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Backtest ``portfolio`` (ticker, shares, buy_price, stop_loss) from ``start`` to ``end``.
+
+    Returns the daily totals, laid out like the ``TOTAL`` rows of the
+    portfolio update, and the stop-loss sales.  ``closes`` defaults to the
+    cached closes for the range.
+    """
+    portfolio = portfolio.dropna(subset=["shares", "buy_price", "stop_loss"]).reset_index(drop=True)
+    if closes is None:
+        closes = load_closes(portfolio["ticker"], start, end)
+    closes = closes.reindex(columns=portfolio["ticker"].unique())
+    matrix = closes[portfolio["ticker"]].to_numpy(dtype=np.float64)
+    shares = portfolio["shares"].astype(int).to_numpy()
+    buy_price = portfolio["buy_price"].to_numpy(dtype=np.float64)
+    result = simulate(matrix, shares, buy_price, portfolio["stop_loss"].to_numpy(dtype=np.float64), cash)
+
+    daily = pd.DataFrame({
+        "Date": closes.index.strftime("%Y-%m-%d"),
+        "Total Value": result["value"].round(2),
+        "PnL": result["pnl"].round(2),
+        "Cash Balance": result["cash"].round(2),
+        "Total Equity": result["equity"].round(2),
+    })
+
+    sold = np.flatnonzero(result["sold_day"] < len(closes))
+    days = result["sold_day"][sold]
+    prices = np.round(matrix[days, sold], 2)
+    trades = pd.DataFrame({
+        "Date": closes.index[days].strftime("%Y-%m-%d"),
+        "Ticker": portfolio["ticker"].to_numpy()[sold],
+        "Shares Sold": shares[sold],
+        "Sell Price": prices,
+        "PnL": np.round((prices - buy_price[sold]) * shares[sold], 2),
+    }).sort_values(["Date", "Ticker"], ignore_index=True)
+    return daily, trades
+
+
+def main(argv: Iterable[str] | None = None) -> None:
+    # Imported here to avoid a circular import with ``trading``
+    from .trading import _load_portfolio, load_config
+
+    parser = argparse.ArgumentParser(prog="trading backtest",
+                                     description="Backtest the stop-loss strategy on cached prices")
+    parser.add_argument("--portfolio", required=True,
+                        help="CSV with columns ticker, shares, stop_loss, buy_price")
+    parser.add_argument("--start", required=True, help="First day (YYYY-MM-DD)")
+    parser.add_argument("--end", required=True, help="Last day (YYYY-MM-DD)")
+    parser.add_argument("--cash", type=float, help="Starting cash value")
+    parser.add_argument("--config", default="config.yaml",
+                        help="Path to YAML/JSON configuration file")
+    parser.add_argument("--output", help="Write the daily totals to this CSV")
+    args = parser.parse_args(list(argv) if argv is not None else None)
+
+    config = load_config(args.config)
+    portfolio, cash = _load_portfolio(args.portfolio, args.cash, config)
+    daily, trades = backtest(portfolio, cash, args.start, args.end)
+    if args.output:
+        daily.to_csv(args.output, index=False)
+    print(trades.to_string(index=False) if not trades.empty else "No stop losses triggered")
+    if not daily.empty:
+        last = daily.iloc[-1]
+        print(f"Final equity on {last['Date']}: ${last['Total Equity']:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,37 +1,340 @@
+"""Per-ticker price store backed by pickled DataFrames.
+
+Each ticker owns a single ``{ticker}.pkl`` file holding its full daily
+history together with the date range it covers.  Period and start/end
+requests are both answered by slicing that history and only the bars missing
+from the covered range are downloaded from the active price provider.  Download options that
+change the bars themselves (such as ``auto_adjust``) get a store of their own.
+"""
+
 import os
 import pickle
+import re
+import tempfile
+import threading
+from collections import OrderedDict
+from contextlib import ExitStack, contextmanager
 from datetime import datetime
 from pathlib import Path
-from typing import Optional
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 
 import pandas as pd
 
-import yfinance as yf
+from .providers import get_provider
+
+# ``PRICE_CACHE_DIR`` lets replay runs keep their own store; the directory
+# is created by the first write, not on import
+CACHE_DIR = Path(os.getenv("PRICE_CACHE_DIR", Path(__file__).resolve().parents[1] / "cache"))
+
+_ONE_DAY = pd.Timedelta(days=1)
+_PERIOD_RE = re.compile(r"^(\d+)(d|wk|mo|y)$")
+# Earliest start used for ``period="max"`` requests
+_MAX_START = pd.Timestamp("1970-01-01")
+
+# yfinance options that do not change the downloaded bars
+_TRANSPORT_OPTIONS = {"progress", "threads", "timeout", "group_by", "multi_level_index"}
+
+# Limits for the in-process memory tier in front of ``CACHE_DIR``
+MEMORY_MAX_ENTRIES = 256
+MEMORY_MAX_BYTES = 64 * 1024 * 1024
+
+
+class MemoryCache:
+    """Bounded LRU of loaded store entries.
+
+    Entries are keyed by file path and remember the mtime of the file they were
+    read from, so a file rewritten by another process is loaded again.
+    """
+
+    def __init__(self, max_entries: int = MEMORY_MAX_ENTRIES, max_bytes: int = MEMORY_MAX_BYTES) -> None:
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._items: "OrderedDict[str, Tuple[int, int, dict]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str, mtime_ns: int, *, count: bool = True) -> Optional[dict]:
+        with self._lock:
+            item = self._items.get(key)
+            if item is None or item[0] != mtime_ns:
+                if item is not None:
+                    self._drop(key)
+                self.misses += count
+                return None
+            self._items.move_to_end(key)
+            self.hits += count
+            return item[2]
+
+    def put(self, key: str, mtime_ns: int, entry: dict) -> None:
+        size = int(entry["data"].memory_usage(deep=True).sum())
+        with self._lock:
+            if key in self._items:
+                self._drop(key)
+            if size > self.max_bytes:
+                return
+            self._items[key] = (mtime_ns, size, entry)
+            self._bytes += size
+            while len(self._items) > self.max_entries or self._bytes > self.max_bytes:
+                self._drop(next(iter(self._items)))
+
+    def discard(self, key: str) -> None:
+        with self._lock:
+            if key in self._items:
+                self._drop(key)
+
+    def miss(self, key: str, *, count: bool = True) -> None:
+        """Record a lookup of ``key`` whose file does not exist."""
+        with self._lock:
+            if key in self._items:
+                self._drop(key)
+            self.misses += count
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+            self._bytes = 0
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._items),
+                "bytes": self._bytes,
+            }
+
+    def _drop(self, key: str) -> None:
+        self._bytes -= self._items.pop(key)[1]
 
-CACHE_DIR = Path(__file__).resolve().parents[1] / "cache"
-CACHE_DIR.mkdir(exist_ok=True)
 
+MEMORY_CACHE = MemoryCache()
 
-def _cache_file(ticker: str, date: Optional[str] = None) -> Path:
-    date = date or datetime.today().strftime("%Y-%m-%d")
-    safe_ticker = ticker.replace("/", "_")
-    return CACHE_DIR / f"{safe_ticker}_{date}.pkl"
 
+# Provider calls made to fill the store and the tickers they covered
+_download_counts = {"downloads": 0, "downloaded_tickers": 0}
+_counts_lock = threading.Lock()
 
-def load_cached(ticker: str, date: Optional[str] = None):
-    """Load cached price data if available."""
-    path = _cache_file(ticker, date)
-    if path.exists():
+
+def cache_stats() -> Dict[str, int]:
+    """Return hit/miss counters and usage of the memory tier and download counts."""
+    with _counts_lock:
+        return {**MEMORY_CACHE.stats(), **_download_counts}
+
+
+def _store_key(ticker: str, options: Optional[dict] = None) -> str:
+    """Return the store name for ``ticker`` downloaded with ``options``."""
+    options = {k: v for k, v in (options or {}).items() if k not in _TRANSPORT_OPTIONS}
+    if not options:
+        return ticker
+    suffix = ",".join(f"{k}={options[k]}" for k in sorted(options))
+    return f"{ticker}@{suffix}"
+
+
+def _cache_file(ticker: str, options: Optional[dict] = None) -> Path:
+    safe_key = _store_key(ticker, options).replace("/", "_")
+    return CACHE_DIR / f"{safe_key}.pkl"
+
+
+def _today() -> pd.Timestamp:
+    return pd.Timestamp(datetime.today().strftime("%Y-%m-%d"))
+
+
+def _period_start(period: str, as_of: pd.Timestamp) -> pd.Timestamp:
+    """Return the first calendar day needed to answer ``period`` at ``as_of``."""
+    if period == "max":
+        return _MAX_START
+    if period == "ytd":
+        return pd.Timestamp(year=as_of.year, month=1, day=1)
+    match = _PERIOD_RE.match(period)
+    if not match:
+        raise ValueError(f"Unsupported period: {period}")
+    count, unit = int(match.group(1)), match.group(2)
+    if unit == "d":
+        # ``Nd`` means N trading days; leave room for weekends and holidays.
+        return as_of - pd.Timedelta(days=count * 2 + 7)
+    if unit == "wk":
+        return as_of - pd.Timedelta(weeks=count)
+    if unit == "mo":
+        return as_of - pd.DateOffset(months=count)
+    return as_of - pd.DateOffset(years=count)
+
+
+def _normalize(data: pd.DataFrame) -> pd.DataFrame:
+    """Flatten yfinance's ``(Price, Ticker)`` columns and index by date."""
+    if isinstance(data.columns, pd.MultiIndex):
+        data = data.copy()
+        data.columns = data.columns.get_level_values(0)
+    if not isinstance(data.index, pd.DatetimeIndex):
+        data.index = pd.to_datetime(data.index)
+    data.index.name = "Date"
+    return data
+
+
+def load_cached(ticker: str, options: Optional[dict] = None, *, count: bool = True) -> Optional[dict]:
+    """Return the stored entry for ``ticker`` if available.
+
+    The entry is a dict with ``start`` and ``end`` (inclusive covered range)
+    and ``data`` (the daily bars within that range).  ``options`` are the
+    yfinance download options the store was built with.  A missing file
+    counts as a miss; pass ``count=False`` for a repeated lookup that should
+    not be counted again.
+    """
+    path = _cache_file(ticker, options)
+    try:
+        mtime_ns = path.stat().st_mtime_ns
+    except FileNotFoundError:
+        MEMORY_CACHE.miss(str(path), count=count)
+        return None
+    entry = MEMORY_CACHE.get(str(path), mtime_ns, count=count)
+    if entry is None:
         with path.open("rb") as f:
-            return pickle.load(f)
-    return None
+            entry = pickle.load(f)
+        MEMORY_CACHE.put(str(path), mtime_ns, entry)
+    return entry
+
 
+def save_cache(ticker: str, entry: dict, options: Optional[dict] = None) -> None:
+    """Save the stored entry for ``ticker``.
 
-def save_cache(ticker: str, data, date: Optional[str] = None) -> None:
-    """Save price data to cache."""
-    path = _cache_file(ticker, date)
-    with path.open("wb") as f:
-        pickle.dump(data, f)
+    The entry is written to a temporary file and renamed into place so
+    readers never see a partially written pickle.
+    """
+    path = _cache_file(ticker, options)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.stem}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump(entry, f)
+        os.replace(tmp, path)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+    MEMORY_CACHE.put(str(path), path.stat().st_mtime_ns, entry)
+
+
+# One lock per ticker so only one thread fills a given store at a time.
+# Threads missing the same bars wait for the thread already downloading them
+# and are then served from the store instead of downloading again.
+_inflight: Dict[str, threading.Lock] = {}
+_inflight_guard = threading.Lock()
+
+
+@contextmanager
+def _filling(tickers: Iterable[str], options: Optional[dict] = None) -> Iterator[None]:
+    """Hold the fill locks for ``tickers``, acquired in a stable order."""
+    keys = sorted({_store_key(t, options) for t in tickers})
+    with _inflight_guard:
+        locks = [_inflight.setdefault(k, threading.Lock()) for k in keys]
+    with ExitStack() as stack:
+        for lock in locks:
+            stack.enter_context(lock)
+        yield
+
+
+def _download(tickers, start: pd.Timestamp, last: pd.Timestamp, **kwargs) -> pd.DataFrame:
+    """Download bars for ``tickers`` between ``start`` and ``last`` inclusive."""
+    kwargs.setdefault("progress", False)
+    with _counts_lock:
+        _download_counts["downloads"] += 1
+        _download_counts["downloaded_tickers"] += 1 if isinstance(tickers, str) else len(tickers)
+    return get_provider().download(
+        tickers,
+        start=start.strftime("%Y-%m-%d"),
+        end=(last + _ONE_DAY).strftime("%Y-%m-%d"),
+        **kwargs,
+    )
+
+
+def _split_download(data: pd.DataFrame, tickers: List[str]) -> Dict[str, pd.DataFrame]:
+    """Split a ``group_by="ticker"`` download into one frame per ticker."""
+    frames = {}
+    columns = data.columns.get_level_values(0) if isinstance(data.columns, pd.MultiIndex) else []
+    for ticker in tickers:
+        if ticker in columns:
+            frame = data[ticker].dropna(how="all")
+        else:
+            frame = pd.DataFrame(index=pd.DatetimeIndex([], name="Date"))
+        frames[ticker] = _normalize(frame)
+    return frames
+
+
+def _missing_ranges(entry: Optional[dict], first: pd.Timestamp, last: pd.Timestamp) -> List[Tuple[pd.Timestamp, pd.Timestamp]]:
+    """Return the ``(start, last)`` ranges not yet covered by ``entry``."""
+    if first > last:
+        return []
+    if entry is None:
+        return [(first, last)]
+    ranges = []
+    if first < entry["start"]:
+        ranges.append((first, entry["start"] - _ONE_DAY))
+    if last > entry["end"]:
+        # Re-fetch the last covered day as it may have been an intraday bar.
+        ranges.append((entry["end"], last))
+    return ranges
+
+
+def _merge(entry: Optional[dict], data: pd.DataFrame, start: pd.Timestamp, last: pd.Timestamp) -> Optional[dict]:
+    """Return ``entry`` extended with ``data`` downloaded for ``start``..``last``.
+
+    yfinance returns an empty frame rather than raising when a download
+    fails, so an empty ``data`` leaves ``entry`` as it was (``None``
+    included).  When ``last`` is today's weekday session the covered range
+    ends at the last bar received, so a run before the market's close does
+    not mark the day as covered.  Past days and weekends are final and are
+    covered as requested, as are missing bars at the start: they are
+    holidays, days before a listing or after a delisting, which a later
+    download would not return either.
+    """
+    if data.empty:
+        return entry
+    data = data.sort_index()
+    if last >= _today() and last.weekday() < 5:
+        last = min(last, data.index[-1])
+    if entry is None:
+        return {"start": start, "end": last, "data": data}
+    combined = pd.concat([entry["data"], data])
+    combined = combined[~combined.index.duplicated(keep="last")].sort_index()
+    return {
+        "start": min(entry["start"], start),
+        "end": max(entry["end"], last),
+        "data": combined,
+    }
+
+
+def _window(date: Optional[str], period: Optional[str], kwargs: dict) -> Tuple[pd.Timestamp, pd.Timestamp, Optional[int]]:
+    """Resolve a request into ``(first, last, tail)``.
+
+    ``start``/``end`` are popped from ``kwargs``.  ``tail`` is the number of
+    trailing bars to keep for ``Nd`` periods and ``None`` otherwise.
+    """
+    today = _today()
+    as_of = min(pd.Timestamp(date) if date else today, today)
+    start = kwargs.pop("start", None)
+    end = kwargs.pop("end", None)
+
+    if start is not None or end is not None:
+        last = min(pd.Timestamp(end) - _ONE_DAY, today) if end is not None else as_of
+        first = pd.Timestamp(start) if start is not None else _period_start(period or "max", last)
+        return first, last, None
+
+    period = period or "max"
+    match = _PERIOD_RE.match(period)
+    tail = int(match.group(1)) if match and match.group(2) == "d" else None
+    return _period_start(period, as_of), as_of, tail
+
+
+def _slice(entry: Optional[dict], first: pd.Timestamp, last: pd.Timestamp, tail: Optional[int]) -> pd.DataFrame:
+    if entry is None:
+        return pd.DataFrame(index=pd.DatetimeIndex([], name="Date"))
+    data = entry["data"]
+    data = data[(data.index >= first) & (data.index <= last)]
+    if tail is not None:
+        data = data.tail(tail)
+    return data.copy()
 
 
 def get_price_data(
@@ -41,13 +344,71 @@ def get_price_data(
     period: str | None = "2d",
     **kwargs,
 ) -> pd.DataFrame:
-    """Get price data for ticker using cache."""
-    cached = load_cached(ticker, date)
-    if cached is not None:
-        return cached
-
-    if period is not None:
-        kwargs["period"] = period
-    data = yf.download(ticker, progress=False, **kwargs)
-    save_cache(ticker, data, date)
-    return data
+    """Get price data for ``ticker`` as of ``date`` using the local store.
+
+    ``period`` selects the trailing window ending at ``date``; explicit
+    ``start``/``end`` keyword arguments select a date range instead, with
+    ``end`` exclusive as in :func:`yfinance.download`.  Both kinds of request
+    share one stored history per ticker.  Intraday ``interval`` requests are
+    passed straight to the price provider.
+    """
+    if kwargs.get("interval", "1d") != "1d":
+        if period is not None and "start" not in kwargs:
+            kwargs["period"] = period
+        kwargs.setdefault("progress", False)
+        return get_provider().download(ticker, **kwargs)
+
+    first, last, tail = _window(date, period, kwargs)
+    entry = load_cached(ticker, kwargs)
+    if _missing_ranges(entry, first, last):
+        with _filling([ticker], kwargs):
+            # Another thread may have filled the gap while we were waiting.
+            entry = load_cached(ticker, kwargs, count=False)
+            missing = _missing_ranges(entry, first, last)
+            updated = entry
+            for start, stop in missing:
+                data = _normalize(_download(ticker, start, stop, **kwargs))
+                updated = _merge(updated, data, start, stop)
+            if updated is not entry:
+                entry = updated
+                save_cache(ticker, entry, kwargs)
+    return _slice(entry, first, last, tail)
+
+
+def get_price_data_many(
+    tickers: Iterable[str],
+    *,
+    date: Optional[str] = None,
+    period: str | None = "2d",
+    **kwargs,
+) -> Dict[str, pd.DataFrame]:
+    """Get price data for several ``tickers`` with batched downloads.
+
+    Accepts the same arguments as :func:`get_price_data` for daily bars.
+    Tickers missing the same range are fetched together in a single yfinance
+    call and the result is returned as a dict keyed by ticker.
+    """
+    tickers = list(dict.fromkeys(tickers))
+    first, last, tail = _window(date, period, kwargs)
+
+    entries = {t: load_cached(t, kwargs) for t in tickers}
+    stale = [t for t, entry in entries.items() if _missing_ranges(entry, first, last)]
+    if stale:
+        with _filling(stale, kwargs):
+            batches: Dict[Tuple[pd.Timestamp, pd.Timestamp], List[str]] = {}
+            for ticker in stale:
+                entries[ticker] = load_cached(ticker, kwargs, count=False)
+                for rng in _missing_ranges(entries[ticker], first, last):
+                    batches.setdefault(rng, []).append(ticker)
+
+            updated = set()
+            for (start, stop), batch in batches.items():
+                data = _download(batch, start, stop, group_by="ticker", **kwargs)
+                for ticker, frame in _split_download(data, batch).items():
+                    if not frame.empty:
+                        entries[ticker] = _merge(entries[ticker], frame, start, stop)
+                        updated.add(ticker)
+            for ticker in updated:
+                save_cache(ticker, entries[ticker], kwargs)
+
+    return {t: _slice(entries[t], first, last, tail) for t in tickers}
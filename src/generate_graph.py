@@ -1,15 +1,28 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from datetime import datetime
 from pathlib import Path
+from typing import Tuple
 
 import pandas as pd
-import matplotlib.pyplot as plt
-import yfinance as yf
+
+from .price_context import BENCHMARK_START, PriceContext, ensure
 
 
 BASE_DIR = Path(__file__).resolve().parents[1]
 
+# Points at the current graph in a graphs directory
+MANIFEST_FILE = "latest.json"
+
+# Bump when the plot itself changes so graphs with unchanged inputs re-render
+_GRAPH_VERSION = 1
 
-def generate_graph(save_path: str | None = None, show: bool = True) -> None:
-    """Generate the performance graph and optionally save it."""
+
+def _load_series(prices: PriceContext | None) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    """Return the ChatGPT equity, Russell 2000 and XBI series to plot."""
 
     # === Load and prepare ChatGPT portfolio ===
     portfolio_file = BASE_DIR / "Scripts and CSV Files" / "chatgpt_portfolio_update.csv"
@@ -18,7 +31,7 @@ def generate_graph(save_path: str | None = None, show: bool = True) -> None:
     chatgpt_totals['Date'] = pd.to_datetime(chatgpt_totals['Date'])
 
     # Add fake baseline row for June 27 (weekend)
-    baseline_date = pd.Timestamp("2025-06-27")
+    baseline_date = BENCHMARK_START
     baseline_equity = 100  # Starting value
     baseline_chatgpt_row = pd.DataFrame({
         "Date": [baseline_date],
@@ -30,15 +43,12 @@ def generate_graph(save_path: str | None = None, show: bool = True) -> None:
     start_date = baseline_date
     end_date = chatgpt_totals['Date'].max()
 
-    russell = yf.download("^RUT", start=start_date, end=end_date + pd.Timedelta(days=1), progress=False)
-    russell = russell.reset_index()
-
-    xbi = yf.download("XBI", start=start_date, end=end_date + pd.Timedelta(days=1), progress=False)
-    xbi = xbi.reset_index()
-
-    # Fix columns if downloaded with MultiIndex
-    if isinstance(russell.columns, pd.MultiIndex):
-        russell.columns = russell.columns.get_level_values(0)
+    # Both series are fetched once per run along with the ``^RUT`` range
+    # used by ``daily_results``.
+    prices = ensure(prices, [], end_date.strftime("%Y-%m-%d"))
+    end = end_date + pd.Timedelta(days=1)
+    russell = prices.range("^RUT", start_date, end).reset_index()
+    xbi = prices.range("XBI", start_date, end).reset_index()
 
     # Now clean and rename
     russell["Date"] = pd.to_datetime(russell["Date"])
@@ -52,6 +62,25 @@ def generate_graph(save_path: str | None = None, show: bool = True) -> None:
     # create adjusted close col
     xbi["XBI Value ($100 Invested)"] = xbi["Close"] * xbi_scaling_factor
     russell["Russell Value ($100 Invested)"] = russell["Close"] * russell_scaling_factor
+    return chatgpt_totals, russell, xbi
+
+
+def graph_hash(chatgpt_totals: pd.DataFrame, russell: pd.DataFrame, xbi: pd.DataFrame) -> str:
+    """Return a content hash of the series drawn on the graph."""
+    digest = hashlib.sha256(f"v{_GRAPH_VERSION}".encode())
+    for frame, column in (
+        (chatgpt_totals, "Total Equity"),
+        (russell, "Russell Value ($100 Invested)"),
+        (xbi, "XBI Value ($100 Invested)"),
+    ):
+        digest.update(frame[["Date", column]].to_csv(index=False).encode())
+    return digest.hexdigest()
+
+
+def _render(chatgpt_totals: pd.DataFrame, russell: pd.DataFrame, xbi: pd.DataFrame,
+            save_path: str | None, show: bool) -> None:
+    # matplotlib is only imported when a graph is actually drawn
+    import matplotlib.pyplot as plt
 
     # === Plot ===
     plt.figure(figsize=(10, 6))
@@ -84,6 +113,54 @@ def generate_graph(save_path: str | None = None, show: bool = True) -> None:
         plt.savefig(save_path)
     if show:
         plt.show()
+    plt.close()
+
+
+def generate_graph(save_path: str | None = None, show: bool = True,
+                   prices: PriceContext | None = None) -> None:
+    """Generate the performance graph and optionally save it.
+
+    Benchmark prices come from ``prices``, the run's price context, when
+    given.
+    """
+    _render(*_load_series(prices), save_path, show)
+
+
+def read_manifest(graph_dir: Path) -> dict | None:
+    """Return the manifest of ``graph_dir`` if it names an existing graph."""
+    try:
+        with (graph_dir / MANIFEST_FILE).open() as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not (graph_dir / manifest.get("file", "")).is_file():
+        return None
+    return manifest
+
+
+def update_graph(graph_dir: Path, name: str, prices: PriceContext | None = None) -> Tuple[Path, bool]:
+    """Make sure ``graph_dir`` holds the current graph.
+
+    The graph is only rendered, to ``graph_dir/name``, when the hash of its
+    series differs from the one recorded in ``graph_dir/latest.json``;
+    otherwise the existing file is kept.  Returns the graph's path and
+    whether it was rendered.
+    """
+    graph_dir = Path(graph_dir)
+    graph_dir.mkdir(parents=True, exist_ok=True)
+    series = _load_series(prices)
+    digest = graph_hash(*series)
+    manifest = read_manifest(graph_dir)
+    if manifest is not None and manifest.get("hash") == digest:
+        return graph_dir / manifest["file"], False
+
+    _render(*series, (graph_dir / name).as_posix(), show=False)
+    manifest = {"hash": digest, "file": name, "updated": datetime.utcnow().isoformat()}
+    tmp = graph_dir / f".{MANIFEST_FILE}.tmp"
+    with tmp.open("w") as f:
+        json.dump(manifest, f)
+    os.replace(tmp, graph_dir / MANIFEST_FILE)
+    return graph_dir / name, True
 
 
 if __name__ == "__main__":
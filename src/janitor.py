@@ -0,0 +1,170 @@
+"""Size- and age-bounded pruning of the price cache directory."""
+
+from __future__ import annotations
+
+import argparse
+import re
+import time
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+from . import cache, settings
+
+CONFIG_FILE = settings.CONFIG_FILE
+
+# Maximum number of files removed or rewritten per idle-time pass
+IDLE_BATCH = 20
+
+# Per-day pickles written by the previous cache layout
+_LEGACY_RE = re.compile(r"^.+_\d{4}-\d{2}-\d{2}\.pkl$")
+
+# Store mtimes already checked against ``keep_latest`` so idle passes skip them
+_trim_checked: Dict[Path, int] = {}
+
+
+def load_limits(config_file: Path = CONFIG_FILE) -> Dict[str, Optional[int]]:
+    """Return the cache limits configured in ``config_file``."""
+    cfg = settings.config(config_file)
+    return {
+        "max_bytes": cfg.get_int("cache_max_bytes"),
+        "max_age_days": cfg.get_int("cache_max_age_days"),
+        "keep_latest": cfg.get_int("cache_keep_latest"),
+    }
+
+
+def _trim(path: Path, keep_latest: int) -> int:
+    """Keep only the latest ``keep_latest`` bars in the store at ``path``.
+
+    The store is read and rewritten under its fill lock, so bars saved by a
+    concurrent fill are not overwritten with an older trimmed copy.
+    """
+    ticker = path.stem
+    with cache._filling([ticker]):
+        entry = cache.load_cached(ticker, count=False)
+        if entry is None or len(entry["data"]) <= keep_latest:
+            return 0
+        before = path.stat().st_size
+        data = entry["data"].iloc[-keep_latest:] if keep_latest > 0 else entry["data"].iloc[:0]
+        start = data.index[0] if not data.empty else entry["end"]
+        cache.save_cache(ticker, {"start": start, "end": entry["end"], "data": data})
+        return before - path.stat().st_size
+
+
+def prune_cache(
+    *,
+    max_bytes: Optional[int] = None,
+    max_age_days: Optional[float] = None,
+    keep_latest: Optional[int] = None,
+    limit: Optional[int] = None,
+    now: Optional[float] = None,
+) -> Dict[str, int]:
+    """Enforce cache limits and return what was reclaimed.
+
+    Obsolete per-day pickles are always removed.  Stores untouched for more
+    than ``max_age_days`` are removed, stores longer than ``keep_latest``
+    bars are trimmed and, while the directory exceeds ``max_bytes``, the
+    least recently written stores are evicted.  At most ``limit`` files are
+    removed or rewritten per call so the work can be spread across calls.
+    """
+    cache_dir = cache.CACHE_DIR
+    now = now or time.time()
+    report = {"removed": 0, "trimmed": 0, "bytes_reclaimed": 0}
+    if not cache_dir.exists():
+        return report
+
+    def budget_left() -> bool:
+        return limit is None or report["removed"] + report["trimmed"] < limit
+
+    def remove(path: Path, size: int) -> None:
+        path.unlink(missing_ok=True)
+        report["removed"] += 1
+        report["bytes_reclaimed"] += size
+
+    # Temporary files left behind by an interrupted ``save_cache``
+    for path in cache_dir.glob(".*.tmp"):
+        try:
+            st = path.stat()
+        except FileNotFoundError:
+            continue
+        if now - st.st_mtime > 3600 and budget_left():
+            remove(path, st.st_size)
+
+    files = {}
+    for path in cache_dir.glob("*.pkl"):
+        try:
+            files[path] = path.stat()
+        except FileNotFoundError:
+            continue
+
+    for path, st in list(files.items()):
+        if not budget_left():
+            return report
+        legacy = _LEGACY_RE.match(path.name) is not None
+        expired = max_age_days is not None and now - st.st_mtime > max_age_days * 86400
+        if legacy or expired:
+            remove(path, st.st_size)
+            del files[path]
+            _trim_checked.pop(path, None)
+
+    if keep_latest is not None:
+        for path in sorted(files):
+            if _trim_checked.get(path) == files[path].st_mtime_ns:
+                continue
+            if not budget_left():
+                return report
+            reclaimed = _trim(path, keep_latest)
+            if reclaimed:
+                report["trimmed"] += 1
+                report["bytes_reclaimed"] += reclaimed
+                files[path] = path.stat()
+            _trim_checked[path] = files[path].st_mtime_ns
+
+    if max_bytes is not None:
+        total = sum(st.st_size for st in files.values())
+        for path, st in sorted(files.items(), key=lambda item: item[1].st_mtime):
+            if total <= max_bytes or not budget_left():
+                break
+            remove(path, st.st_size)
+            _trim_checked.pop(path, None)
+            total -= st.st_size
+
+    return report
+
+
+def run_janitor(config_file: Path = CONFIG_FILE, *, limit: Optional[int] = None) -> Dict[str, int]:
+    """Prune the cache using the limits configured in ``config_file``."""
+    return prune_cache(limit=limit, **load_limits(config_file))
+
+
+def idle_prune(config_file: Path = CONFIG_FILE) -> None:
+    """Run a small janitor pass between scheduler jobs."""
+    try:
+        report = run_janitor(config_file, limit=IDLE_BATCH)
+    except Exception as exc:
+        print(f"Cache janitor failed: {exc}")
+        return
+    if report["removed"] or report["trimmed"]:
+        print(_format_report(report))
+
+
+def _format_report(report: Dict[str, int]) -> str:
+    return (
+        f"Cache janitor removed {report['removed']} files, trimmed "
+        f"{report['trimmed']} and reclaimed {report['bytes_reclaimed']:,} bytes"
+    )
+
+
+def main(argv: Iterable[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Prune the price cache")
+    parser.add_argument("--config", default=CONFIG_FILE.as_posix(),
+                        help="Path to YAML configuration file")
+    parser.add_argument("--limit", type=int,
+                        help="Maximum number of files to remove or rewrite")
+    args = parser.parse_args(list(argv) if argv is not None else None)
+
+    report = run_janitor(Path(args.config), limit=args.limit)
+    print(_format_report(report))
+
+
+if __name__ == "__main__":
+    main()
@@ -8,16 +8,9 @@ from email.message import EmailMessage
 from pathlib import Path
 from typing import Optional
 
-import yaml
+from . import settings
 
-CONFIG_FILE = Path(__file__).resolve().parents[1] / "config.yaml"
-
-
-def _load_config(config_file: Path = CONFIG_FILE) -> dict:
-    if config_file.exists():
-        with open(config_file, "r") as f:
-            return yaml.safe_load(f) or {}
-    return {}
+CONFIG_FILE = settings.CONFIG_FILE
 
 
 def _send_email(to_addr: str, subject: str, body: str) -> None:
@@ -43,9 +36,9 @@ def _send_webhook(url: str, body: str) -> None:
 
 def send_notification(message: str, *, subject: str = "Trade Alert", config_file: Path = CONFIG_FILE) -> None:
     """Send ``message`` using configured notification methods."""
-    cfg = _load_config(config_file)
-    email = cfg.get("email")
-    webhook_url = cfg.get("webhook_url")
+    cfg = settings.config(config_file)
+    email = cfg.get_str("email")
+    webhook_url = cfg.get_str("webhook_url")
 
     if email:
         _send_email(email, subject, message)
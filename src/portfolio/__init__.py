@@ -3,97 +3,191 @@
 from __future__ import annotations
 
 import asyncio
-import os
+import random
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import List, Dict, Any
+from functools import partial
+from typing import List, Dict, Any, Tuple
 
 import pandas as pd
-import yfinance as yf
 from ..broker import place_order
+from ..cache import get_price_data, get_price_data_many
 from ..notifications import send_notification
+from ..price_context import PriceContext
+from . import history, journal, ledger, pnl
+
+
+def _last_closes(price_map: Dict[str, pd.DataFrame]) -> Dict[str, float]:
+    return {
+        ticker: data["Close"].iloc[-1]
+        for ticker, data in price_map.items()
+        if not data.empty
+    }
 
 
 class Portfolio:
     """Utility class implementing the previous module functions."""
 
-    def __init__(self, today: str | None = None) -> None:
+    def __init__(
+        self,
+        today: str | None = None,
+        *,
+        concurrency: int = 4,
+        timeout: float = 30.0,
+        retries: int = 2,
+        batch_size: int = 50,
+        pnl_method: str | None = None,
+        portfolio_file: str = ledger.PORTFOLIO_FILE,
+        trade_log: str = journal.TRADE_LOG,
+    ) -> None:
         self.today = today or datetime.today().strftime("%Y-%m-%d")
+        # Price fetch limits used by ``process_async``
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.retries = retries
+        self.batch_size = batch_size
+        # Cost method of the PnL engine, ``None`` keeps the one in use
+        self.pnl_method = pnl_method
+        # Where the daily update and the trade journal are written
+        self.portfolio_file = str(portfolio_file)
+        self.trade_log = str(trade_log)
+        # Rows written to the portfolio update by the last ``process`` call
+        self.rows_written = 0
+
+    async def _fetch_batch(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        executor: ThreadPoolExecutor,
+        sem: asyncio.Semaphore,
+        tickers: List[str],
+        attempts: int,
+        period: str = "1d",
+    ) -> Tuple[Dict[str, pd.DataFrame], List[str]]:
+        """Fetch ``tickers`` and return their bars and the tickers still missing.
+
+        yfinance reports a failed or timed out ticker as an empty frame
+        rather than raising, so tickers that come back empty are fetched
+        again on the next attempt, after a jittered backoff.  The timeout is
+        passed to the provider with the download, so a slow request fails
+        inside the cache call and releases its fill locks.
+        """
+        frames: Dict[str, pd.DataFrame] = {}
+        missing = list(tickers)
+        for attempt in range(attempts):
+            if attempt:
+                await asyncio.sleep(0.5 * 2 ** (attempt - 1) * random.uniform(0.5, 1.5))
+            fetch = partial(get_price_data_many, missing, period=period, date=self.today, timeout=self.timeout)
+            async with sem:
+                try:
+                    result = await loop.run_in_executor(executor, fetch)
+                except Exception:
+                    continue
+            frames.update((t, data) for t, data in result.items() if not data.empty)
+            missing = [t for t in missing if t not in frames]
+            if not missing:
+                break
+        return frames, missing
+
+    async def _download_all(
+        self, tickers: List[str], period: str = "1d"
+    ) -> Tuple[Dict[str, pd.DataFrame], List[str]]:
+        """Return the last ``period`` of daily bars for ``tickers`` and the tickers that failed.
+
+        Tickers are fetched from the price cache in batches of ``batch_size``,
+        at most ``concurrency`` at a time.  Tickers a batch could not price
+        are retried one at a time so a single hung ticker only fails itself.
+        """
+        if not tickers:
+            return {}, []
+        loop = asyncio.get_running_loop()
+        sem = asyncio.Semaphore(self.concurrency)
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            batches = [tickers[i:i + self.batch_size] for i in range(0, len(tickers), self.batch_size)]
+            results = await asyncio.gather(
+                *(self._fetch_batch(loop, executor, sem, b, self.retries + 1, period) for b in batches)
+            )
+            price_map: Dict[str, pd.DataFrame] = {}
+            failed: List[str] = []
+            for frames, missing in results:
+                price_map.update(frames)
+                failed.extend(missing)
+
+            if failed and self.batch_size > 1:
+                singles = await asyncio.gather(
+                    *(self._fetch_batch(loop, executor, sem, [t], 1, period) for t in failed)
+                )
+                failed = []
+                for frames, missing in singles:
+                    price_map.update(frames)
+                    failed.extend(missing)
+            return price_map, failed
+
+    def fetch_prices(self, tickers: List[str], period: str = "2d") -> Dict[str, pd.DataFrame]:
+        """Return the last ``period`` of daily bars for ``tickers``.
+
+        Tickers are fetched with the same concurrency, timeout and retries as
+        :meth:`process`; ones that could not be priced are reported and left
+        out.
+        """
+        price_map, failed = asyncio.run(self._download_all(list(dict.fromkeys(tickers)), period))
+        for ticker in failed:
+            print(f"Warning: could not fetch prices for {ticker}")
+        return price_map
+
+    def _evaluate(
+        self,
+        portfolio: pd.DataFrame,
+        price_map: Dict[str, pd.DataFrame],
+        starting_cash: float,
+    ) -> Tuple[pd.DataFrame, List[Tuple[str, int, float, float, float, str]]]:
+        """Return the daily update rows for ``portfolio`` priced from ``price_map``.
+
+        Prices, values, PnL and stop-loss checks are evaluated column-wise.
+        Triggered stop losses are returned as ``log_sell`` argument tuples
+        so the caller can record them together.  Positions without a price
+        are kept as ``HOLD - No Price`` rows and left out of the totals.
+        """
+        last_close = _last_closes(price_map)
+        portfolio = portfolio.reset_index(drop=True)
+        priced = portfolio["ticker"].isin(list(last_close))
+        for ticker in portfolio.loc[~priced, "ticker"]:
+            print(f"Warning: no price history for {ticker}, keeping it unpriced")
+
+        shares = portfolio["shares"].astype(int)
+        cost = portfolio["buy_price"]
+        stop = portfolio["stop_loss"]
+        price = portfolio["ticker"].map(last_close).astype(float).round(2)
+        value = (price * shares).round(2)
+        pnl = ((price - cost) * shares).round(2)
+        sold = price <= stop
+        held = priced & ~sold
+
+        sales = [
+            (ticker, int(qty), px, basis, gain, "SELL - Stop Loss Triggered")
+            for ticker, qty, px, basis, gain in zip(
+                portfolio["ticker"][sold], shares[sold], price[sold], cost[sold], pnl[sold]
+            )
+        ]
 
-    async def _fetch_history(self, ticker: str):
-        data = await asyncio.to_thread(yf.Ticker(ticker).history, period="1d")
-        return ticker, data
-
-    async def _download_all(self, tickers: List[str]):
-        tasks = [self._fetch_history(t) for t in tickers]
-        results = await asyncio.gather(*tasks)
-        return {t: d for t, d in results}
-
-    def process(self, portfolio: pd.DataFrame | str, starting_cash: float) -> str:
-        if isinstance(portfolio, str):
-            portfolio = pd.read_csv(portfolio)
-
-        # Normalize column names if they come from a daily update CSV
-        rename_map = {
-            "Ticker": "ticker",
-            "Shares": "shares",
-            "Stop Loss": "stop_loss",
-            "Buy Price": "buy_price",
-            "Cost Basis": "cost_basis",
-        }
-        for old, new in rename_map.items():
-            if old in portfolio.columns and new not in portfolio.columns:
-                portfolio = portfolio.rename(columns={old: new})
-
-        # Drop any summary rows or incomplete entries that may appear in the CSV
-        if "ticker" in portfolio.columns:
-            portfolio = portfolio[~portfolio["ticker"].astype(str).str.upper().eq("TOTAL")]
-        portfolio = portfolio.dropna(subset=["shares", "buy_price", "stop_loss"], how="any")
+        rows = pd.DataFrame({
+            "Date": self.today,
+            "Ticker": portfolio["ticker"],
+            "Shares": shares,
+            "Cost Basis": cost,
+            "Stop Loss": stop,
+            "Current Price": price,
+            "Total Value": value,
+            "PnL": pnl,
+            "Action": sold.map({True: "SELL - Stop Loss Triggered", False: "HOLD"}).where(priced, "HOLD - No Price"),
+            "Cash Balance": "",
+            "Total Equity": "",
+        })
 
-        tickers = portfolio["ticker"].tolist()
-        price_map = asyncio.run(self._download_all(tickers))
-
-        results: List[Dict[str, Any]] = []
-        total_value = 0.0
-        total_pnl = 0.0
-        cash = starting_cash
-
-        for _, stock in portfolio.iterrows():
-            ticker = stock["ticker"]
-            shares = int(stock["shares"])
-            cost = stock["buy_price"]
-            stop = stock["stop_loss"]
-            data = price_map.get(ticker, pd.DataFrame())
-
-            if data.empty:
-                print(f"Warning: no price history for {ticker}, skipping")
-                continue
-
-            price = round(data["Close"].iloc[-1], 2)
-            value = round(price * shares, 2)
-            pnl = round((price - cost) * shares, 2)
-
-            if price <= stop:
-                action = "SELL - Stop Loss Triggered"
-                cash += value
-                self.log_sell(ticker, shares, price, cost, pnl, action)
-            else:
-                action = "HOLD"
-                total_value += value
-                total_pnl += pnl
-
-            results.append({
-                "Date": self.today,
-                "Ticker": ticker,
-                "Shares": shares,
-                "Cost Basis": cost,
-                "Stop Loss": stop,
-                "Current Price": price,
-                "Total Value": value,
-                "PnL": pnl,
-                "Action": action,
-                "Cash Balance": "",
-                "Total Equity": "",
-            })
+        # Accumulate left to right so totals match the previous row-by-row
+        # loop exactly, including its rounding of the running sums.
+        total_value = sum(value[held].to_numpy(), 0.0)
+        total_pnl = sum(pnl[held].to_numpy(), 0.0)
+        cash = sum(value[sold].to_numpy(), starting_cash)
 
         total_row = {
             "Date": self.today,
@@ -108,17 +202,46 @@ class Portfolio:
             "Cash Balance": round(cash, 2),
             "Total Equity": round(total_value + cash, 2),
         }
-        results.append(total_row)
+        return pd.concat([rows, pd.DataFrame([total_row])], ignore_index=True), sales
 
-        file = "Scripts and CSV Files/chatgpt_portfolio_update.csv"
-        df = pd.DataFrame(results)
+    def process(self, portfolio: pd.DataFrame | str, starting_cash: float, prices: PriceContext | None = None) -> str:
+        """Price ``portfolio``, apply stop losses and update the portfolio CSV.
 
-        if os.path.exists(file):
-            existing = pd.read_csv(file)
-            existing = existing[existing["Date"] != self.today]
-            df = pd.concat([existing, df], ignore_index=True)
+        Tickers priced in ``prices``, the run's price context, are not fetched
+        again; ones it could not price are.  Use :meth:`process_async` from code already running an event
+        loop.
+        """
+        return asyncio.run(self.process_async(portfolio, starting_cash, prices))
+
+    async def process_async(self, portfolio: pd.DataFrame | str, starting_cash: float, prices: PriceContext | None = None) -> str:
+        """Asynchronous version of :meth:`process`."""
+        if isinstance(portfolio, str):
+            portfolio = pd.read_csv(portfolio)
 
-        df.to_csv(file, index=False)
+        portfolio = ledger.normalize_positions(portfolio)
+        portfolio = portfolio.dropna(subset=["shares", "buy_price", "stop_loss"], how="any")
+
+        tickers = portfolio["ticker"].tolist()
+        known = {t: prices.bars(t, 1) for t in tickers if prices is not None and t in prices}
+        price_map, failed = await self._download_all([t for t in tickers if t not in known])
+        price_map.update(known)
+        for ticker in failed:
+            print(f"Warning: could not fetch prices for {ticker}")
+
+        df, sales = self._evaluate(portfolio, price_map, starting_cash)
+
+        file = self.portfolio_file
+        history.write_day(file, self.today, df)
+        self.rows_written = len(df)
+        ledger.record_day(file, df)
+        # Stop-loss sales from this pass are committed together
+        self.log_sells(sales)
+        try:
+            engine = pnl.get_engine(self.trade_log, self.pnl_method)
+            engine.mark(_last_closes(price_map))
+            engine.checkpoint(pnl.checkpoint_path(self.trade_log))
+        except Exception as exc:
+            print(f"Warning: could not update PnL: {exc}")
         try:
             from dashboard.audit import record_change
             record_change("system", "portfolio_update", {"file": file})
@@ -135,27 +258,40 @@ class Portfolio:
         pnl: float,
         reason: str = "AUTOMATED SELL - STOPLOSS TRIGGERED",
     ) -> None:
-        log = {
-            "Date": self.today,
-            "Ticker": ticker,
-            "Shares Sold": shares,
-            "Sell Price": price,
-            "Cost Basis": cost,
-            "PnL": pnl,
-            "Reason": reason,
-        }
+        self.log_sells([(ticker, shares, price, cost, pnl, reason)])
 
-        file = "Scripts and CSV Files/chatgpt_trade_log.csv"
-        if os.path.exists(file):
-            df = pd.read_csv(file)
-            df = pd.concat([df, pd.DataFrame([log])], ignore_index=True)
-        else:
-            df = pd.DataFrame([log])
-        df.to_csv(file, index=False)
+    def log_sells(self, sales: List[Tuple[str, int, float, float, float, str]]) -> None:
+        """Record ``log_sell`` argument tuples with one trade log write.
 
-        send_notification(
+        All sales share a single notification and a single audit entry.
+        """
+        if not sales:
+            return
+        logs = [
+            {
+                "Date": self.today,
+                "Ticker": ticker,
+                "Shares Sold": shares,
+                "Sell Price": price,
+                "Cost Basis": cost,
+                "PnL": pnl,
+                "Reason": reason,
+            }
+            for ticker, shares, price, cost, pnl, reason in sales
+        ]
+
+        journal.append_trades(logs, self.trade_log)
+        try:
+            from dashboard.audit import record_change
+            record_change("system", "trade_sell", {"trades": logs})
+        except Exception:
+            pass
+
+        messages = [
             f"Sold {shares} shares of {ticker} at {price} (PnL: {pnl:.2f}). Reason: {reason}"
-        )
+            for ticker, shares, price, cost, pnl, reason in sales
+        ]
+        send_notification("\n".join(messages))
 
     def log_manual_buy(
         self,
@@ -172,7 +308,7 @@ class Portfolio:
         if check == "1":
             raise SystemExit("Please remove this function call.")
 
-        data = yf.download(ticker, period="1d")
+        data = get_price_data(ticker, period="1d", date=self.today)
         if data.empty:
             raise SystemExit(f"error, could not find ticker {ticker}")
         if buy_price * shares > cash:
@@ -191,13 +327,7 @@ class Portfolio:
             "Reason": "MANUAL BUY - New position",
         }
 
-        file = "Scripts and CSV Files/chatgpt_trade_log.csv"
-        if os.path.exists(file):
-            df = pd.read_csv(file)
-            df = pd.concat([df, pd.DataFrame([log])], ignore_index=True)
-        else:
-            df = pd.DataFrame([log])
-        df.to_csv(file, index=False)
+        journal.append_trades([log], self.trade_log)
         try:
             from dashboard.audit import record_change
             record_change("manual", "trade_buy", log)
@@ -261,13 +391,7 @@ class Portfolio:
             "Shares Sold": shares_sold,
             "Sell Price": sell_price,
         }
-        file = "Scripts and CSV Files/chatgpt_trade_log.csv"
-        if os.path.exists(file):
-            df = pd.read_csv(file)
-            df = pd.concat([df, pd.DataFrame([log])], ignore_index=True)
-        else:
-            df = pd.DataFrame([log])
-        df.to_csv(file, index=False)
+        journal.append_trades([log], self.trade_log)
         try:
             from dashboard.audit import record_change
             record_change("manual", "trade_sell", log)
@@ -291,6 +415,10 @@ class Portfolio:
         )
         return cash, chatgpt_portfolio
 
+    def pnl_summary(self) -> pd.DataFrame:
+        """Return realized and unrealized PnL per ticker from the trade log."""
+        return pnl.get_engine(self.trade_log, self.pnl_method).frame()
+
     def paper_buy(self, ticker: str, qty: int, order_type: str = "market"):
         """Place a paper buy order through the broker API."""
         return place_order(ticker, qty, "buy", order_type)
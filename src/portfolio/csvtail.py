@@ -0,0 +1,41 @@
+"""Helpers for reading the head and tail of the portfolio CSV files."""
+
+from __future__ import annotations
+
+import csv
+import os
+from typing import Iterator, List, Tuple
+
+_CHUNK = 64 * 1024
+
+
+def read_header(path: str) -> List[str]:
+    """Return the column names in the first line of the CSV at ``path``."""
+    with open(path, newline="") as f:
+        return next(csv.reader(f), [])
+
+
+def reverse_lines(f) -> Iterator[Tuple[int, bytes]]:
+    """Yield ``(offset, line)`` pairs from the end of binary file ``f``.
+
+    Blank lines are skipped.
+    """
+    f.seek(0, os.SEEK_END)
+    pos = f.tell()
+    buffer = b""
+    while pos > 0:
+        step = min(_CHUNK, pos)
+        pos -= step
+        f.seek(pos)
+        buffer = f.read(step) + buffer
+        lines = buffer.split(b"\n")
+        # The first piece may be a partial line unless we reached the start.
+        buffer = lines.pop(0) if pos > 0 else b""
+        offset = pos + len(buffer) + (1 if pos > 0 else 0)
+        starts = []
+        for line in lines:
+            starts.append(offset)
+            offset += len(line) + 1
+        for start, line in reversed(list(zip(starts, lines))):
+            if line.strip():
+                yield start, line
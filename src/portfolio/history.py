@@ -0,0 +1,105 @@
+"""Append-only storage for the daily portfolio update CSV.
+
+Rows are kept in date order, so the rows for the most recent day always sit
+at the end of the file.  Replacing the current day therefore only needs the
+file's tail: the trailing block for that day is located by reading backwards,
+the file is truncated there and the new rows are appended.  The CSV itself
+stays the export format read by the dashboard and the graph.
+"""
+
+from __future__ import annotations
+
+import csv
+import io
+import os
+from typing import List, Optional, Tuple
+
+import pandas as pd
+
+from .csvtail import read_header, reverse_lines
+
+
+def _tail_block(path: str, date_col: int, date: str) -> Tuple[Optional[int], Optional[str]]:
+    """Locate the trailing rows dated ``date``.
+
+    Returns the offset where they start (end of file when there are none)
+    and the date of the last row, or ``(None, None)`` if the file only
+    holds a header.
+    """
+    with open(path, "rb") as f:
+        size = f.seek(0, os.SEEK_END)
+        start = size
+        last_date = None
+        for offset, line in reverse_lines(f):
+            if offset == 0:
+                break  # header
+            row = next(csv.reader([line.decode()]))
+            row_date = row[date_col] if date_col < len(row) else ""
+            if last_date is None:
+                last_date = row_date
+            if row_date != date:
+                break
+            start = offset
+        if last_date is None:
+            return None, None
+        return start, last_date
+
+
+def _rewrite(path: str, date: str, rows: pd.DataFrame) -> None:
+    existing = pd.read_csv(path)
+    existing = existing[existing["Date"] != date]
+    pd.concat([existing, rows], ignore_index=True).to_csv(path, index=False)
+
+
+def write_day(path: str, date: str, rows: pd.DataFrame) -> None:
+    """Store ``rows`` as the entries for ``date`` in the CSV at ``path``.
+
+    Existing rows for ``date`` are replaced.  When ``date`` is the latest
+    day in the file (the daily run and dashboard trades) only the tail is
+    touched; writing an older day or a different column layout falls back
+    to rewriting the whole file.
+    """
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        rows.to_csv(path, index=False)
+        return
+
+    header = read_header(path)
+    if header != list(rows.columns):
+        _rewrite(path, date, rows)
+        return
+
+    start, last_date = _tail_block(path, header.index("Date"), date)
+    if last_date is not None and last_date > date:
+        _rewrite(path, date, rows)
+        return
+
+    with open(path, "r+b") as f:
+        if start is None:
+            start = f.seek(0, os.SEEK_END)
+        f.truncate(start)
+        if start > 0:
+            f.seek(start - 1)
+            if f.read(1) != b"\n":
+                f.write(b"\n")
+    rows.to_csv(path, mode="a", header=False, index=False)
+
+
+def read_latest_day(path: str) -> pd.DataFrame:
+    """Return the rows for the most recent day without reading the whole file."""
+    with open(path, "rb") as f:
+        header = f.readline().decode()
+        date_col = next(csv.reader([header])).index("Date")
+        lines: List[bytes] = []
+        latest = None
+        for offset, line in reverse_lines(f):
+            if offset == 0:
+                break
+            row = next(csv.reader([line.decode()]))
+            row_date = row[date_col] if date_col < len(row) else ""
+            if latest is None:
+                latest = row_date
+            elif row_date != latest:
+                break
+            lines.append(line)
+    body = b"\n".join(reversed(lines)).decode()
+    return pd.read_csv(io.StringIO(header + body))
@@ -0,0 +1,95 @@
+"""Append-only trade journal backed by the trade log CSV."""
+
+from __future__ import annotations
+
+import csv
+import io
+import os
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import pandas as pd
+
+from .csvtail import read_header, reverse_lines
+
+TRADE_LOG = "Scripts and CSV Files/chatgpt_trade_log.csv"
+
+# Column layout of every journal record
+FIELDS = [
+    "Date",
+    "Ticker",
+    "Shares Bought",
+    "Buy Price",
+    "Cost Basis",
+    "PnL",
+    "Reason",
+    "Shares Sold",
+    "Sell Price",
+]
+
+
+def _migrate(path: str) -> List[str]:
+    """Rewrite a log written with another column order to :data:`FIELDS`.
+
+    Columns outside the schema are kept after it.  This happens once per
+    legacy file; afterwards records are only appended.
+    """
+    df = pd.read_csv(path, dtype=str, keep_default_na=False)
+    columns = FIELDS + [c for c in df.columns if c not in FIELDS]
+    df.reindex(columns=columns, fill_value="").to_csv(path, index=False)
+    return columns
+
+
+def append_trades(records: Iterable[Dict[str, Any]], path: str = TRADE_LOG) -> None:
+    """Append ``records`` to the journal at ``path`` and flush them to disk.
+
+    Missing fields are left empty.  Cost is independent of the number of
+    trades already in the journal.
+    """
+    records = list(records)
+    if not records:
+        return
+    new_file = not os.path.exists(path) or os.path.getsize(path) == 0
+    columns = FIELDS if new_file else read_header(path)
+    if not new_file and not set(FIELDS).issubset(columns):
+        columns = _migrate(path)
+
+    with open(path, "a", newline="") as f:
+        writer = csv.writer(f, lineterminator="\n")
+        if new_file:
+            writer.writerow(columns)
+        for record in records:
+            writer.writerow(["" if record.get(c) is None else record.get(c) for c in columns])
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def read_trades(path: str = TRADE_LOG, limit: Optional[int] = None) -> pd.DataFrame:
+    """Return the journal as a DataFrame, optionally only the last ``limit`` trades."""
+    if limit is None:
+        return pd.read_csv(path)
+    with open(path, "rb") as f:
+        header = f.readline().decode()
+        lines: List[bytes] = []
+        for offset, line in reverse_lines(f):
+            if offset == 0 or len(lines) >= limit:
+                break
+            lines.append(line)
+    body = b"\n".join(reversed(lines)).decode()
+    return pd.read_csv(io.StringIO(header + body))
+
+
+def read_since(path: str, offset: int = 0) -> Tuple[List[str], List[Dict[str, str]], int]:
+    """Return the header, the records after byte ``offset`` and the new offset.
+
+    Only complete lines are returned, so the offset can be kept to pick up
+    later appends.  An ``offset`` of 0 reads the whole journal.
+    """
+    with open(path, "rb") as f:
+        header_line = f.readline()
+        header = next(csv.reader([header_line.decode()]), [])
+        f.seek(max(offset, len(header_line)))
+        data = f.read()
+    end = data.rfind(b"\n") + 1
+    lines = data[:end].decode().splitlines()
+    records = [dict(zip(header, row)) for row in csv.reader(lines) if row]
+    return header, records, max(offset, len(header_line)) + end
@@ -0,0 +1,293 @@
+"""In-memory ledger of open positions and cash.
+
+The ledger is the canonical view of the current portfolio.  It is built once
+from the latest day of the portfolio update CSV, kept current as trades are
+applied and replaced whenever a processing pass writes a new day.  A JSON
+snapshot is written next to the CSV after every pass so a restarted process
+can skip parsing the CSV as long as the CSV has not changed since.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Tuple
+
+import pandas as pd
+
+from . import history
+
+PORTFOLIO_FILE = "Scripts and CSV Files/chatgpt_portfolio_update.csv"
+
+# Column names accepted for positions read from CSV files
+RENAME_MAP = {
+    "Ticker": "ticker",
+    "Shares": "shares",
+    "Stop Loss": "stop_loss",
+    "Buy Price": "buy_price",
+    "Cost Basis": "cost_basis",
+}
+
+COLUMNS = ["ticker", "shares", "stop_loss", "buy_price", "cost_basis"]
+
+
+class Position:
+    """A single open position."""
+
+    __slots__ = ("ticker", "shares", "buy_price", "stop_loss")
+
+    def __init__(self, ticker: str, shares: int, buy_price: float, stop_loss: float) -> None:
+        self.ticker = ticker
+        self.shares = shares
+        self.buy_price = buy_price
+        self.stop_loss = stop_loss
+
+    @property
+    def cost_basis(self) -> float:
+        return self.shares * self.buy_price
+
+    def to_dict(self) -> Dict[str, float]:
+        return {
+            "ticker": self.ticker,
+            "shares": self.shares,
+            "stop_loss": self.stop_loss,
+            "buy_price": self.buy_price,
+            "cost_basis": self.cost_basis,
+        }
+
+    def __repr__(self) -> str:
+        return (
+            f"Position({self.ticker!r}, shares={self.shares}, "
+            f"buy_price={self.buy_price}, stop_loss={self.stop_loss})"
+        )
+
+
+class Ledger:
+    """Open positions keyed by ticker plus the cash balance."""
+
+    def __init__(self, positions: Optional[Dict[str, Position]] = None, cash: float = 0.0, date: Optional[str] = None) -> None:
+        self.positions: Dict[str, Position] = positions or {}
+        self.cash = cash
+        self.date = date
+        # ``(mtime_ns, size)`` of the CSV this ledger matches
+        self.stamp: Optional[Tuple[int, int]] = None
+        self.lock = threading.RLock()
+
+    def __iter__(self) -> Iterator[Position]:
+        return iter(self.positions.values())
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    # ---- construction -------------------------------------------------
+
+    @classmethod
+    def from_rows(cls, rows: pd.DataFrame) -> "Ledger":
+        """Build a ledger from one day of portfolio update rows.
+
+        Positions sold that day and the ``TOTAL`` row are left out; the
+        ``TOTAL`` row provides the cash balance.  ``Cost Basis`` in these
+        rows is the per-share buy price.
+        """
+        ledger = cls()
+        if rows.empty:
+            return ledger
+        ledger.date = str(rows["Date"].iloc[-1])
+        tickers = rows["Ticker"].astype(str)
+        total = rows[tickers.str.upper() == "TOTAL"]
+        if not total.empty:
+            cash = pd.to_numeric(total["Cash Balance"], errors="coerce").iloc[-1]
+            ledger.cash = 0.0 if pd.isna(cash) else float(cash)
+
+        held = rows[tickers.str.upper() != "TOTAL"]
+        if "Action" in held.columns:
+            held = held[~held["Action"].fillna("").astype(str).str.startswith("SELL")]
+        for ticker, shares, price, stop in zip(
+            held["Ticker"], held["Shares"], held["Cost Basis"], held["Stop Loss"]
+        ):
+            if pd.isna(shares):
+                continue
+            ledger._add(str(ticker), int(shares), float(price), float(stop))
+        return ledger
+
+    @classmethod
+    def from_history(cls, path: str | Path = PORTFOLIO_FILE) -> "Ledger":
+        """Build a ledger from the latest day in the portfolio update CSV."""
+        path = Path(path)
+        if not path.exists() or path.stat().st_size == 0:
+            return cls()
+        ledger = cls.from_rows(history.read_latest_day(str(path)))
+        ledger.stamp = _stamp(path)
+        return ledger
+
+    # ---- trades -------------------------------------------------------
+
+    def _add(self, ticker: str, shares: int, price: float, stop_loss: float) -> None:
+        position = self.positions.get(ticker)
+        if position is None:
+            self.positions[ticker] = Position(ticker, shares, price, stop_loss)
+            return
+        total = position.shares + shares
+        position.buy_price = (position.cost_basis + shares * price) / total
+        position.shares = total
+        position.stop_loss = stop_loss
+
+    def copy(self) -> "Ledger":
+        """Return an unshared copy to apply trades to before they are written."""
+        with self.lock:
+            positions = {
+                t: Position(p.ticker, p.shares, p.buy_price, p.stop_loss)
+                for t, p in self.positions.items()
+            }
+            ledger = Ledger(positions, self.cash, self.date)
+            ledger.stamp = self.stamp
+            return ledger
+
+    def sell(self, ticker: str, shares: int, price: float) -> float:
+        """Remove ``shares`` of ``ticker`` sold at ``price`` and return the PnL."""
+        with self.lock:
+            position = self.positions.get(ticker)
+            if position is None:
+                raise KeyError(f"error, could not find {ticker} in portfolio")
+            if shares > position.shares:
+                raise ValueError(
+                    f"You are trying to sell {shares} but only own {position.shares}."
+                )
+            position.shares -= shares
+            if position.shares == 0:
+                del self.positions[ticker]
+            self.cash += shares * price
+            return (price - position.buy_price) * shares
+
+    # ---- export -------------------------------------------------------
+
+    def to_frame(self) -> pd.DataFrame:
+        """Return the positions in the lowercase layout used by ``Portfolio``."""
+        with self.lock:
+            return pd.DataFrame([p.to_dict() for p in self], columns=COLUMNS)
+
+    def snapshot(self, path: str | Path) -> None:
+        """Write the ledger to the JSON file at ``path``."""
+        path = Path(path)
+        with self.lock:
+            state = {
+                "date": self.date,
+                "cash": self.cash,
+                "stamp": list(self.stamp) if self.stamp else None,
+                "positions": [
+                    [p.ticker, p.shares, p.buy_price, p.stop_loss] for p in self
+                ],
+            }
+        tmp = path.with_name(f".{path.name}.tmp")
+        with tmp.open("w") as f:
+            json.dump(state, f)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str | Path) -> "Ledger":
+        """Read a ledger written by :meth:`snapshot`."""
+        with Path(path).open() as f:
+            state = json.load(f)
+        positions = {p[0]: Position(*p) for p in state["positions"]}
+        ledger = cls(positions, state["cash"], state["date"])
+        ledger.stamp = tuple(state["stamp"]) if state["stamp"] else None
+        return ledger
+
+
+def normalize_positions(portfolio: pd.DataFrame, default_stop: Optional[float] = None) -> pd.DataFrame:
+    """Map a positions CSV to the lowercase layout used by ``Portfolio``.
+
+    Summary rows and rows without a share count are dropped, a missing buy
+    price is derived from the cost basis and ``default_stop`` fills missing
+    stop losses.
+    """
+    for old, new in RENAME_MAP.items():
+        if old in portfolio.columns and new not in portfolio.columns:
+            portfolio = portfolio.rename(columns={old: new})
+
+    if "ticker" in portfolio.columns:
+        portfolio = portfolio[~portfolio["ticker"].astype(str).str.upper().eq("TOTAL")]
+    if "shares" in portfolio.columns:
+        portfolio = portfolio[portfolio["shares"].notna()]
+
+    if "buy_price" not in portfolio.columns and {"cost_basis", "shares"}.issubset(portfolio.columns):
+        portfolio = portfolio.assign(buy_price=portfolio["cost_basis"] / portfolio["shares"])
+    if default_stop is not None:
+        if "stop_loss" not in portfolio.columns:
+            portfolio = portfolio.assign(stop_loss=default_stop)
+        else:
+            portfolio = portfolio.assign(stop_loss=portfolio["stop_loss"].fillna(default_stop))
+    return portfolio
+
+
+# ---- shared instances -----------------------------------------------------
+
+_ledgers: Dict[Path, Ledger] = {}
+_registry_lock = threading.Lock()
+
+
+def _stamp(path: Path) -> Optional[Tuple[int, int]]:
+    try:
+        st = path.stat()
+    except FileNotFoundError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def snapshot_path(path: str | Path) -> Path:
+    """Return where the ledger snapshot for the CSV at ``path`` is kept."""
+    path = Path(path)
+    return path.with_name(f"{path.stem}.ledger.json")
+
+
+def get_ledger(path: str | Path = PORTFOLIO_FILE) -> Ledger:
+    """Return the shared ledger for the portfolio update CSV at ``path``.
+
+    The ledger is rebuilt only when the CSV was changed by something other
+    than :func:`record_day`, e.g. edited by hand.
+    """
+    path = Path(path).resolve()
+    stamp = _stamp(path)
+    with _registry_lock:
+        ledger = _ledgers.get(path)
+        if ledger is not None and ledger.stamp == stamp:
+            return ledger
+        ledger = None
+        snap = snapshot_path(path)
+        if stamp is not None and snap.exists():
+            try:
+                cached = Ledger.load(snap)
+            except (OSError, ValueError, KeyError, TypeError):
+                cached = None
+            if cached is not None and cached.stamp == stamp:
+                ledger = cached
+        if ledger is None:
+            ledger = Ledger.from_history(path)
+        _ledgers[path] = ledger
+        return ledger
+
+
+def record_day(path: str | Path, rows: pd.DataFrame) -> Ledger:
+    """Replace the shared ledger for ``path`` with the day just written to it.
+
+    ``rows`` are the portfolio update rows written to the CSV.  The new
+    state is snapshotted next to the CSV.
+    """
+    path = Path(path).resolve()
+    ledger = Ledger.from_rows(rows)
+    ledger.stamp = _stamp(path)
+    with _registry_lock:
+        _ledgers[path] = ledger
+    try:
+        ledger.snapshot(snapshot_path(path))
+    except OSError as exc:
+        print(f"Warning: could not write ledger snapshot: {exc}")
+    return ledger
+
+
+def clear() -> None:
+    """Forget all shared ledgers."""
+    with _registry_lock:
+        _ledgers.clear()
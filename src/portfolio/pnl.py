@@ -0,0 +1,283 @@
+"""Running realized and unrealized PnL per ticker from the trade journal.
+
+:class:`PnLEngine` applies journal records one at a time, so each trade
+costs O(1) (FIFO lots are consumed at most once).  Its state, together with
+the journal byte offset it has read up to, is checkpointed to JSON next to
+the journal; :func:`get_engine` resumes from the checkpoint and only applies
+trades appended since.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+from collections import deque
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Mapping, Optional
+
+import pandas as pd
+
+from . import journal
+
+METHODS = ("average", "fifo")
+
+
+def _number(value: Any) -> Optional[float]:
+    if value is None or value == "":
+        return None
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return None if number != number else number
+
+
+class TickerPnL:
+    """Open lots and PnL for one ticker."""
+
+    __slots__ = ("shares", "cost", "realized", "price", "lots")
+
+    def __init__(self) -> None:
+        self.shares = 0.0
+        self.cost = 0.0
+        self.realized = 0.0
+        self.price: Optional[float] = None
+        # ``[shares, price]`` lots, oldest first; only used for FIFO
+        self.lots: Deque[List[float]] = deque()
+
+    @property
+    def unrealized(self) -> float:
+        if self.price is None or not self.shares:
+            return 0.0
+        return self.shares * self.price - self.cost
+
+
+class PnLEngine:
+    """Realized and unrealized PnL per ticker using ``method`` cost tracking.
+
+    ``method`` is ``"average"`` (average cost) or ``"fifo"``.
+    """
+
+    def __init__(self, method: str = "average") -> None:
+        if method not in METHODS:
+            raise ValueError(f"Unknown PnL method: {method}")
+        self.method = method
+        self.tickers: Dict[str, TickerPnL] = {}
+        self.realized = 0.0
+        self.unrealized = 0.0
+        # Position in the journal covered by this state
+        self.offset = 0
+        self.header: List[str] = []
+        self.lock = threading.RLock()
+
+    def _book(self, ticker: str) -> TickerPnL:
+        book = self.tickers.get(ticker)
+        if book is None:
+            book = self.tickers[ticker] = TickerPnL()
+        return book
+
+    # ---- updates ------------------------------------------------------
+
+    def buy(self, ticker: str, shares: float, price: float) -> None:
+        with self.lock:
+            book = self._book(ticker)
+            before = book.unrealized
+            book.shares += shares
+            book.cost += shares * price
+            if self.method == "fifo":
+                book.lots.append([shares, price])
+            self.unrealized += book.unrealized - before
+
+    def sell(self, ticker: str, shares: float, price: float, pnl: Optional[float] = None) -> float:
+        """Close ``shares`` at ``price`` and return the realized PnL.
+
+        Shares beyond the tracked position (bought before the journal
+        started) are realized at their share of ``pnl``, the PnL recorded
+        with the trade, or at zero when none was recorded.
+        """
+        with self.lock:
+            book = self._book(ticker)
+            before = book.unrealized
+            covered = min(shares, book.shares)
+            if self.method == "fifo":
+                cost = 0.0
+                left = covered
+                while left > 0 and book.lots:
+                    lot = book.lots[0]
+                    used = min(left, lot[0])
+                    cost += used * lot[1]
+                    lot[0] -= used
+                    left -= used
+                    if lot[0] <= 0:
+                        book.lots.popleft()
+            else:
+                cost = book.cost * covered / book.shares if book.shares else 0.0
+            gain = covered * price - cost
+            if shares > covered and pnl is not None:
+                gain += pnl * (shares - covered) / shares
+            book.shares -= covered
+            book.cost = book.cost - cost if book.shares else 0.0
+            book.price = price
+            book.realized += gain
+            self.realized += gain
+            self.unrealized += book.unrealized - before
+            return gain
+
+    def apply(self, record: Mapping[str, Any]) -> None:
+        """Apply one trade journal record."""
+        ticker = record.get("Ticker")
+        if not ticker:
+            return
+        bought = _number(record.get("Shares Bought"))
+        sold = _number(record.get("Shares Sold"))
+        if bought:
+            self.buy(ticker, bought, _number(record.get("Buy Price")) or 0.0)
+        if sold:
+            self.sell(ticker, sold, _number(record.get("Sell Price")) or 0.0, _number(record.get("PnL")))
+
+    def mark(self, prices: Mapping[str, float]) -> None:
+        """Value open positions at ``prices``."""
+        with self.lock:
+            for ticker, price in prices.items():
+                book = self.tickers.get(ticker)
+                if book is None or price != price:
+                    continue
+                before = book.unrealized
+                book.price = float(price)
+                self.unrealized += book.unrealized - before
+
+    # ---- reporting ----------------------------------------------------
+
+    def frame(self) -> pd.DataFrame:
+        """Return shares, cost and PnL per ticker."""
+        with self.lock:
+            rows = [
+                {
+                    "ticker": ticker,
+                    "shares": book.shares,
+                    "cost": round(book.cost, 2),
+                    "price": book.price,
+                    "realized": round(book.realized, 2),
+                    "unrealized": round(book.unrealized, 2),
+                }
+                for ticker, book in sorted(self.tickers.items())
+            ]
+        return pd.DataFrame(rows, columns=["ticker", "shares", "cost", "price", "realized", "unrealized"])
+
+    # ---- persistence --------------------------------------------------
+
+    def catch_up(self, path: str | Path) -> int:
+        """Apply journal records appended since the last call; return how many."""
+        with self.lock:
+            header, records, offset = journal.read_since(str(path), self.offset)
+            if self.offset and header != self.header:
+                raise ValueError("journal layout changed")
+            for record in records:
+                self.apply(record)
+            self.header, self.offset = header, offset
+            return len(records)
+
+    def checkpoint(self, path: str | Path) -> None:
+        """Write the engine state to the JSON file at ``path``."""
+        path = Path(path)
+        with self.lock:
+            state = {
+                "method": self.method,
+                "offset": self.offset,
+                "header": self.header,
+                "tickers": {
+                    ticker: [b.shares, b.cost, b.realized, b.price, [list(l) for l in b.lots]]
+                    for ticker, b in self.tickers.items()
+                },
+            }
+        tmp = path.with_name(f".{path.name}.tmp")
+        with tmp.open("w") as f:
+            json.dump(state, f)
+        os.replace(tmp, path)
+
+    @classmethod
+    def restore(cls, path: str | Path) -> "PnLEngine":
+        """Read an engine written by :meth:`checkpoint`."""
+        with Path(path).open() as f:
+            state = json.load(f)
+        engine = cls(state["method"])
+        engine.offset = state["offset"]
+        engine.header = state["header"]
+        for ticker, (shares, cost, realized, price, lots) in state["tickers"].items():
+            book = engine._book(ticker)
+            book.shares, book.cost, book.realized, book.price = shares, cost, realized, price
+            book.lots.extend(lots)
+            engine.realized += realized
+            engine.unrealized += book.unrealized
+        return engine
+
+    @classmethod
+    def from_journal(cls, path: str | Path = journal.TRADE_LOG, method: str = "average") -> "PnLEngine":
+        """Build an engine by replaying the whole journal at ``path``."""
+        engine = cls(method)
+        engine.catch_up(path)
+        return engine
+
+
+# ---- shared instances -----------------------------------------------------
+
+_engines: Dict[Path, PnLEngine] = {}
+_registry_lock = threading.Lock()
+
+
+def checkpoint_path(path: str | Path) -> Path:
+    """Return where the engine checkpoint for the journal at ``path`` is kept."""
+    path = Path(path)
+    return path.with_name(f"{path.stem}.pnl.json")
+
+
+def _resume(path: Path, method: Optional[str]) -> PnLEngine:
+    snap = checkpoint_path(path)
+    if snap.exists():
+        try:
+            engine = PnLEngine.restore(snap)
+        except (OSError, ValueError, KeyError, TypeError):
+            engine = None
+        if engine is not None and method in (None, engine.method) and engine.offset <= path.stat().st_size:
+            try:
+                engine.catch_up(path)
+                return engine
+            except ValueError:
+                pass
+    return PnLEngine.from_journal(path, method or "average")
+
+
+def get_engine(path: str | Path = journal.TRADE_LOG, method: Optional[str] = None) -> PnLEngine:
+    """Return the shared engine for the journal at ``path``, caught up with it.
+
+    ``method`` defaults to the one already in use for ``path`` (average cost
+    for a new engine).  A checkpoint is written whenever new trades were
+    applied; a journal that was rewritten (shorter than the checkpoint or
+    with another header) is replayed from the start.
+    """
+    path = Path(path).resolve()
+    with _registry_lock:
+        engine = _engines.get(path)
+        if not path.exists():
+            return engine or PnLEngine(method or "average")
+        if engine is None or method not in (None, engine.method):
+            engine = _engines[path] = _resume(path, method)
+            engine.checkpoint(checkpoint_path(path))
+            return engine
+        try:
+            stale = engine.offset > path.stat().st_size
+            if not stale and engine.catch_up(path):
+                engine.checkpoint(checkpoint_path(path))
+        except ValueError:
+            stale = True
+        if stale:
+            engine = _engines[path] = PnLEngine.from_journal(path, engine.method)
+            engine.checkpoint(checkpoint_path(path))
+        return engine
+
+
+def clear() -> None:
+    """Forget all shared engines."""
+    with _registry_lock:
+        _engines.clear()
@@ -0,0 +1,89 @@
+"""Prices shared by the stages of one trading run."""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Dict, Iterable, Optional
+
+import pandas as pd
+
+from .cache import get_price_data_many
+
+if TYPE_CHECKING:
+    from .portfolio import Portfolio
+
+# Benchmarks compared against the portfolio and the day the comparison starts
+BENCHMARKS = ("^RUT", "XBI")
+BENCHMARK_START = pd.Timestamp("2025-06-27")
+
+
+class PriceContext:
+    """Daily bars for every ticker a run needs, fetched once up front.
+
+    Held tickers get their last two bars; benchmarks get their full history
+    since :data:`BENCHMARK_START`.  Build one with :meth:`build` and pass it
+    to ``Portfolio.process``, ``daily_results`` and ``generate_graph``.
+    """
+
+    def __init__(self, today: str, frames: Dict[str, pd.DataFrame]) -> None:
+        self.today = today
+        self.frames = frames
+
+    @classmethod
+    def build(
+        cls,
+        tickers: Iterable[str],
+        *,
+        today: str,
+        benchmarks: Iterable[str] = BENCHMARKS,
+        portfolio: Optional["Portfolio"] = None,
+    ) -> "PriceContext":
+        """Fetch ``tickers`` and ``benchmarks`` through the price cache.
+
+        Each group is fetched once, so every series is downloaded at most
+        once.  With ``portfolio`` the held tickers go through
+        :meth:`Portfolio.fetch_prices`, in batches under its fetch limits;
+        otherwise they are a single cache call.
+        """
+        benchmarks = list(dict.fromkeys(benchmarks))
+        held = [t for t in dict.fromkeys(tickers) if t not in benchmarks]
+        frames: Dict[str, pd.DataFrame] = {}
+        if held and portfolio is not None:
+            frames.update(portfolio.fetch_prices(held, period="2d"))
+        elif held:
+            frames.update(get_price_data_many(held, period="2d", date=today))
+        if benchmarks:
+            frames.update(get_price_data_many(
+                benchmarks,
+                start=BENCHMARK_START,
+                end=pd.Timestamp(today) + pd.Timedelta(days=1),
+            ))
+        return cls(today, frames)
+
+    def __contains__(self, ticker: str) -> bool:
+        """Return whether ``ticker`` was fetched and has bars."""
+        frame = self.frames.get(ticker)
+        return frame is not None and not frame.empty
+
+    def bars(self, ticker: str, count: int = 2) -> pd.DataFrame:
+        """Return the last ``count`` daily bars of ``ticker``."""
+        return self.frames[ticker].tail(count)
+
+    def range(self, ticker: str, start=None, end=None) -> pd.DataFrame:
+        """Return the bars of ``ticker`` from ``start`` up to, not including, ``end``."""
+        data = self.frames[ticker]
+        if start is not None:
+            data = data[data.index >= pd.Timestamp(start)]
+        if end is not None:
+            data = data[data.index < pd.Timestamp(end)]
+        return data
+
+    def subset(self, tickers: Iterable[str]) -> "PriceContext":
+        """Return a context holding only ``tickers`` (ones not fetched are skipped)."""
+        return PriceContext(self.today, {t: self.frames[t] for t in tickers if t in self.frames})
+
+
+def ensure(prices: Optional[PriceContext], tickers: Iterable[str], today: str, **kwargs) -> PriceContext:
+    """Return ``prices`` or, for a stage run on its own, a context built for it."""
+    if prices is not None:
+        return prices
+    return PriceContext.build(tickers, today=today, **kwargs)
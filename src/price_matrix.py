@@ -0,0 +1,209 @@
+"""Memory-mapped matrix of closing prices shared across processes."""
+
+from __future__ import annotations
+
+import json
+import os
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from . import cache
+
+DATA_FILE = "closes.f8"
+INDEX_FILE = "index.json"
+
+# Spare rows/columns allocated up front so daily updates can write in place
+_MIN_ROWS = 64
+_MIN_COLS = 512
+
+
+def default_dir() -> Path:
+    """Return the directory holding the matrix inside the price cache."""
+    return cache.CACHE_DIR / "matrix"
+
+
+class PriceMatrix:
+    """Dense ``tickers x trading days`` array of closes backed by ``np.memmap``.
+
+    Missing bars are ``NaN``.  ``index.json`` maps tickers to rows and lists
+    the date of every column; the data file is preallocated beyond the used
+    shape so appending a day or a ticker does not rewrite existing prices.
+    Readers open the file read-only and get zero-copy views of it; a rebuild
+    replaces the file, so long-lived readers should re-open after one.
+    """
+
+    def __init__(self, directory: Path, tickers: List[str], dates: List[pd.Timestamp], array: np.memmap) -> None:
+        self.directory = directory
+        self.tickers = tickers
+        self.dates = dates
+        self.rows: Dict[str, int] = {t: i for i, t in enumerate(tickers)}
+        self._array = array
+        self._positions: Optional[Dict[pd.Timestamp, int]] = None
+
+    # ---- construction -------------------------------------------------
+
+    @classmethod
+    def open(cls, directory: Optional[Path] = None, *, writable: bool = False) -> "PriceMatrix":
+        """Open an existing matrix, read-only unless ``writable``."""
+        directory = directory or default_dir()
+        with (directory / INDEX_FILE).open() as f:
+            index = json.load(f)
+        array = np.memmap(
+            directory / DATA_FILE,
+            dtype=np.float64,
+            mode="r+" if writable else "r",
+            shape=tuple(index["capacity"]),
+        )
+        dates = [pd.Timestamp(d) for d in index["dates"]]
+        return cls(directory, list(index["tickers"]), dates, array)
+
+    @classmethod
+    def open_or_create(cls, directory: Optional[Path] = None) -> "PriceMatrix":
+        """Open the matrix for writing, creating an empty one if needed."""
+        directory = directory or default_dir()
+        if (directory / INDEX_FILE).exists():
+            return cls.open(directory, writable=True)
+        return cls._allocate(directory, [], [], None)
+
+    @classmethod
+    def build(cls, tickers: Iterable[str], directory: Optional[Path] = None) -> "PriceMatrix":
+        """Build a fresh matrix from the price store for ``tickers``."""
+        directory = directory or default_dir()
+        series = {t: _cached_closes(t) for t in dict.fromkeys(tickers)}
+        frame = pd.DataFrame(series).sort_index()
+        dates = list(frame.index)
+        return cls._allocate(directory, list(frame.columns), dates, frame.to_numpy(dtype=np.float64).T)
+
+    @classmethod
+    def _allocate(cls, directory: Path, tickers: List[str], dates: List[pd.Timestamp], values: Optional[np.ndarray]) -> "PriceMatrix":
+        directory.mkdir(parents=True, exist_ok=True)
+        shape = (_capacity(len(tickers), _MIN_ROWS), _capacity(len(dates), _MIN_COLS))
+        tmp = directory / f".{DATA_FILE}.tmp"
+        array = np.memmap(tmp, dtype=np.float64, mode="w+", shape=shape)
+        array[:] = np.nan
+        if values is not None and values.size:
+            array[: values.shape[0], : values.shape[1]] = values
+        array.flush()
+        os.replace(tmp, directory / DATA_FILE)
+        matrix = cls(directory, tickers, dates, array)
+        matrix._write_index()
+        return matrix
+
+    # ---- reading ------------------------------------------------------
+
+    @property
+    def values(self) -> np.ndarray:
+        """Zero-copy view of the used part of the matrix."""
+        return self._array[: len(self.tickers), : len(self.dates)]
+
+    def row(self, ticker: str) -> np.ndarray:
+        """Zero-copy view of the closes for ``ticker``."""
+        return self._array[self.rows[ticker], : len(self.dates)]
+
+    def frame(self, tickers: Optional[Iterable[str]] = None) -> pd.DataFrame:
+        """Return closes as a ``dates x tickers`` DataFrame (copied)."""
+        tickers = list(tickers) if tickers is not None else self.tickers
+        rows = [self.rows[t] for t in tickers]
+        return pd.DataFrame(
+            self._array[rows, : len(self.dates)].T,
+            index=pd.DatetimeIndex(self.dates, name="Date"),
+            columns=tickers,
+        )
+
+    # ---- updating -----------------------------------------------------
+
+    def update(self, ticker: str, closes: pd.Series, *, flush: bool = True) -> None:
+        """Write ``closes`` for ``ticker`` into the matrix.
+
+        New trading days after the last column and new tickers are appended
+        in place; anything else (an earlier or inserted day, exhausted
+        capacity) rebuilds the data file.  Pass ``flush=False`` when writing
+        many tickers and call :meth:`flush` once at the end.
+        """
+        closes = closes.dropna().sort_index()
+        if closes.empty and ticker in self.rows:
+            return
+        last = self.dates[-1] if self.dates else None
+        new_dates = [d for d in closes.index if d not in self._date_pos]
+        if any(last is not None and d <= last for d in new_dates):
+            self._rebuild({ticker: closes})
+            return
+
+        rows_needed = len(self.tickers) + (ticker not in self.rows)
+        cols_needed = len(self.dates) + len(new_dates)
+        if rows_needed > self._array.shape[0] or cols_needed > self._array.shape[1]:
+            self._rebuild({ticker: closes})
+            return
+
+        if ticker not in self.rows:
+            self.rows[ticker] = len(self.tickers)
+            self.tickers.append(ticker)
+        self.dates.extend(new_dates)
+        self._positions = None
+        cols = [self._date_pos[d] for d in closes.index]
+        self._array[self.rows[ticker], cols] = closes.to_numpy(dtype=np.float64)
+        if flush:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write pending prices and the index to disk."""
+        self._array.flush()
+        self._write_index()
+
+    def update_from_cache(self, tickers: Iterable[str]) -> None:
+        """Refresh ``tickers`` from the price store."""
+        for ticker in dict.fromkeys(tickers):
+            self.update(ticker, _cached_closes(ticker), flush=False)
+        self.flush()
+
+    @property
+    def _date_pos(self) -> Dict[pd.Timestamp, int]:
+        if self._positions is None or len(self._positions) != len(self.dates):
+            self._positions = {d: i for i, d in enumerate(self.dates)}
+        return self._positions
+
+    def _rebuild(self, extra: Dict[str, pd.Series]) -> None:
+        frame = self.frame() if self.tickers else pd.DataFrame()
+        for ticker, closes in extra.items():
+            merged = closes.combine_first(frame[ticker]) if ticker in frame else closes
+            frame = frame.reindex(frame.index.union(merged.index))
+            frame[ticker] = merged
+        frame = frame.sort_index()
+        rebuilt = self._allocate(self.directory, list(frame.columns), list(frame.index), frame.to_numpy(dtype=np.float64).T)
+        self.tickers, self.dates, self.rows, self._array = rebuilt.tickers, rebuilt.dates, rebuilt.rows, rebuilt._array
+        self._positions = None
+
+    def _write_index(self) -> None:
+        index = {
+            "tickers": self.tickers,
+            "dates": [d.strftime("%Y-%m-%d") for d in self.dates],
+            "capacity": list(self._array.shape),
+        }
+        tmp = self.directory / f".{INDEX_FILE}.tmp"
+        with tmp.open("w") as f:
+            json.dump(index, f)
+        os.replace(tmp, self.directory / INDEX_FILE)
+
+
+def _capacity(used: int, minimum: int) -> int:
+    capacity = minimum
+    while capacity < used * 2:
+        capacity *= 2
+    return capacity
+
+
+def _cached_closes(ticker: str) -> pd.Series:
+    entry = cache.load_cached(ticker)
+    if entry is None or "Close" not in entry["data"]:
+        return pd.Series(dtype=np.float64)
+    return entry["data"]["Close"].astype(np.float64)
+
+
+def refresh(tickers: Iterable[str], directory: Optional[Path] = None) -> PriceMatrix:
+    """Bring the shared matrix up to date with the price store for ``tickers``."""
+    matrix = PriceMatrix.open_or_create(directory)
+    matrix.update_from_cache(tickers)
+    return matrix
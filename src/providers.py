@@ -0,0 +1,177 @@
+"""Pluggable price providers.
+
+Every module that needs market data goes through :func:`get_provider`.  The
+default provider calls yfinance; the replay provider serves bars recorded to
+local CSV files so whole runs can be reproduced without network access.
+
+The provider is chosen with environment variables::
+
+    PRICE_PROVIDER=replay
+    PRICE_REPLAY_DIR=/path/to/recording
+    PRICE_REPLAY_LATENCY=0.05   # seconds added to every call
+"""
+
+from __future__ import annotations
+
+import os
+import re
+import threading
+import time
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+import pandas as pd
+
+_PROVIDER_ENV = "PRICE_PROVIDER"
+_REPLAY_DIR_ENV = "PRICE_REPLAY_DIR"
+_REPLAY_LATENCY_ENV = "PRICE_REPLAY_LATENCY"
+
+_DAYS_RE = re.compile(r"^(\d+)d$")
+
+
+def _yfinance():
+    """Import yfinance on first use; it is slow to import and only needed to fetch."""
+    import yfinance
+
+    return yfinance
+
+
+def __getattr__(name: str):
+    # ``providers.yf`` still resolves to the yfinance module
+    if name == "yf":
+        return _yfinance()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+class PriceProvider(ABC):
+    """Source of daily price bars."""
+
+    @abstractmethod
+    def download(self, tickers, **kwargs) -> pd.DataFrame:
+        """Return bars like :func:`yfinance.download`."""
+
+    def quotes(self, tickers: Iterable[str]) -> Dict[str, float]:
+        """Return the latest price of each of ``tickers`` from one request.
+
+        Tickers without a recent bar are left out.
+        """
+        names = list(dict.fromkeys(tickers))
+        if not names:
+            return {}
+        bars = self.download(names, period="1d", interval="1m", group_by="ticker", progress=False)
+        prices: Dict[str, float] = {}
+        for ticker in names:
+            if isinstance(bars.columns, pd.MultiIndex):
+                if ticker not in bars.columns.get_level_values(0):
+                    continue
+                closes = bars[ticker]["Close"]
+            else:
+                closes = bars["Close"] if "Close" in bars else pd.Series(dtype=float)
+            closes = closes.dropna()
+            if not closes.empty:
+                prices[ticker] = float(closes.iloc[-1])
+        return prices
+
+
+class YFinanceProvider(PriceProvider):
+    """Fetch prices from Yahoo Finance."""
+
+    def download(self, tickers, **kwargs) -> pd.DataFrame:
+        return _yfinance().download(tickers, **kwargs)
+
+
+class ReplayProvider(PriceProvider):
+    """Serve recorded bars from ``{ticker}.csv`` files in ``directory``.
+
+    Each file holds a ``Date`` column followed by the price columns, as
+    written by :func:`record`.  ``latency`` seconds are slept on every call
+    to mimic a remote source; a call whose ``timeout`` is shorter than that
+    raises :class:`TimeoutError` once the timeout has passed.
+    """
+
+    def __init__(self, directory: str | Path, latency: float = 0.0) -> None:
+        self.directory = Path(directory)
+        self.latency = latency
+        self._bars: Dict[str, pd.DataFrame] = {}
+        self._lock = threading.Lock()
+
+    def _load(self, ticker: str) -> pd.DataFrame:
+        with self._lock:
+            if ticker not in self._bars:
+                path = self.directory / f"{ticker.replace('/', '_')}.csv"
+                if path.exists():
+                    bars = pd.read_csv(path, index_col="Date", parse_dates=["Date"])
+                else:
+                    bars = pd.DataFrame(index=pd.DatetimeIndex([], name="Date"))
+                self._bars[ticker] = bars.sort_index()
+            return self._bars[ticker]
+
+    def _select(self, ticker: str, start=None, end=None, period: Optional[str] = None) -> pd.DataFrame:
+        bars = self._load(ticker)
+        if start is not None:
+            bars = bars[bars.index >= pd.Timestamp(start)]
+        if end is not None:
+            bars = bars[bars.index < pd.Timestamp(end)]
+        if start is None and end is None and period not in (None, "max"):
+            match = _DAYS_RE.match(period)
+            if not match:
+                raise ValueError(f"Replay provider only supports Nd periods, got {period}")
+            bars = bars.tail(int(match.group(1)))
+        return bars.copy()
+
+    def download(self, tickers, *, start=None, end=None, period=None, group_by=None,
+                 timeout=None, **kwargs) -> pd.DataFrame:
+        if timeout is not None and self.latency > timeout:
+            time.sleep(timeout)
+            raise TimeoutError(f"replay download took longer than {timeout}s")
+        if self.latency:
+            time.sleep(self.latency)
+        if isinstance(tickers, str) and group_by != "ticker":
+            return self._select(tickers, start, end, period)
+        names = [tickers] if isinstance(tickers, str) else list(tickers)
+        frames = {t: self._select(t, start, end, period) for t in names}
+        return pd.concat(frames, axis=1)
+
+
+def record(tickers: Iterable[str], directory: str | Path, *, start, end,
+           source: Optional[PriceProvider] = None) -> None:
+    """Record daily bars for ``tickers`` from ``source`` for later replay."""
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    source = source or YFinanceProvider()
+    for ticker in tickers:
+        bars = source.download(ticker, start=start, end=end, progress=False)
+        if isinstance(bars.columns, pd.MultiIndex):
+            bars.columns = bars.columns.get_level_values(0)
+        bars.index.name = "Date"
+        bars.to_csv(directory / f"{ticker.replace('/', '_')}.csv")
+
+
+_provider: Optional[PriceProvider] = None
+
+
+def _from_env() -> PriceProvider:
+    name = os.getenv(_PROVIDER_ENV, "yfinance")
+    if name == "replay":
+        directory = os.getenv(_REPLAY_DIR_ENV)
+        if not directory:
+            raise EnvironmentError(f"{_REPLAY_DIR_ENV} must be set for the replay provider")
+        return ReplayProvider(directory, float(os.getenv(_REPLAY_LATENCY_ENV, "0")))
+    if name == "yfinance":
+        return YFinanceProvider()
+    raise ValueError(f"Unknown price provider: {name}")
+
+
+def get_provider() -> PriceProvider:
+    """Return the active price provider."""
+    global _provider
+    if _provider is None:
+        _provider = _from_env()
+    return _provider
+
+
+def set_provider(provider: Optional[PriceProvider]) -> None:
+    """Use ``provider`` for all price requests (``None`` restores the default)."""
+    global _provider
+    _provider = provider
@@ -0,0 +1,137 @@
+"""Configuration and credentials cached until their file changes.
+
+``config(path)`` returns the parsed ``config.yaml`` (or ``.json``) and
+``env(path)`` the parsed ``.env`` file.  Each is parsed once and kept in
+memory; every access only stats the file and re-parses it when its
+``(mtime_ns, size)`` stamp changed, so hot paths such as trade
+notifications and authenticated dashboard requests do not re-read it.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import yaml
+from dotenv import dotenv_values
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+CONFIG_FILE = BASE_DIR / "config.yaml"
+ENV_FILE = BASE_DIR / ".env"
+
+
+def _parse_config(path: Path) -> dict:
+    with open(path, "r") as f:
+        if path.suffix == ".json":
+            return json.load(f) or {}
+        return yaml.safe_load(f) or {}
+
+
+def _parse_env(path: Path) -> dict:
+    return dict(dotenv_values(path))
+
+
+def _stamp(path: Path) -> Optional[Tuple[int, int]]:
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+class Settings:
+    """Parsed contents of one settings file, reloaded when the file changes.
+
+    A missing file reads as empty.
+    """
+
+    def __init__(self, path: Path, parse: Callable[[Path], dict]) -> None:
+        self.path = path
+        self._parse = parse
+        self._stamp: Optional[Tuple[int, int]] = None
+        self._data: Dict[str, Any] = {}
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    @property
+    def data(self) -> Dict[str, Any]:
+        """The parsed file, re-read only if its stamp changed."""
+        stamp = _stamp(self.path)
+        with self._lock:
+            if not self._loaded or stamp != self._stamp:
+                self._data = self._parse(self.path) if stamp is not None else {}
+                self._stamp = stamp
+                self._loaded = True
+            return self._data
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Return a copy of the settings that callers may modify."""
+        return dict(self.data)
+
+    def invalidate(self) -> None:
+        """Force the next access to re-read the file."""
+        with self._lock:
+            self._loaded = False
+
+    # ---- typed accessors ----------------------------------------------
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self.data.get(key, default)
+
+    def get_str(self, key: str, default: Optional[str] = None) -> Optional[str]:
+        value = self.data.get(key)
+        return default if value is None else str(value)
+
+    def get_float(self, key: str, default: Optional[float] = None) -> Optional[float]:
+        value = self.data.get(key)
+        return default if value in (None, "") else float(value)
+
+    def get_int(self, key: str, default: Optional[int] = None) -> Optional[int]:
+        value = self.data.get(key)
+        return default if value in (None, "") else int(value)
+
+    def get_bool(self, key: str, default: bool = False) -> bool:
+        value = self.data.get(key)
+        if value in (None, ""):
+            return default
+        if isinstance(value, str):
+            return value.strip().lower() in ("1", "true", "yes", "on")
+        return bool(value)
+
+    def get_list(self, key: str, default: Optional[List[Any]] = None) -> List[Any]:
+        value = self.data.get(key)
+        if value in (None, ""):
+            return list(default or [])
+        return list(value) if isinstance(value, (list, tuple)) else [value]
+
+
+_settings: Dict[Tuple[str, Path], Settings] = {}
+_settings_lock = threading.Lock()
+
+
+def _get(kind: str, path: Path | str, parse: Callable[[Path], dict]) -> Settings:
+    key = (kind, Path(path).resolve())
+    with _settings_lock:
+        settings = _settings.get(key)
+        if settings is None:
+            settings = _settings[key] = Settings(key[1], parse)
+        return settings
+
+
+def config(path: Path | str = CONFIG_FILE) -> Settings:
+    """Return the shared settings for the YAML/JSON config at ``path``."""
+    return _get("config", path, _parse_config)
+
+
+def env(path: Path | str = ENV_FILE) -> Settings:
+    """Return the shared settings for the ``.env`` file at ``path``."""
+    return _get("env", path, _parse_env)
+
+
+def clear() -> None:
+    """Drop every cached settings file."""
+    with _settings_lock:
+        _settings.clear()
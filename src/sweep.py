@@ -0,0 +1,178 @@
+"""Parameter sweep over stop-loss settings.
+
+Every configuration sets the stop of each position to ``buy_price * (1 -
+level)``, with a global level and optional per-ticker overrides, and is run
+through :func:`backtest.simulate`.  Configurations are evaluated in chunks by
+a process pool; each worker maps the shared price matrix read-only, so the
+closes are read from one file however many workers and configurations run.
+"""
+
+from __future__ import annotations
+
+import argparse
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from . import price_matrix
+from .backtest import load_closes, simulate
+
+# Configurations per task sent to a worker
+CHUNK_SIZE = 64
+
+# Set by ``_init_worker`` in each pool process
+_state: Dict[str, object] = {}
+
+
+def grid(levels: Iterable[float], overrides: Optional[Mapping[str, Iterable[float]]] = None) -> List[Dict]:
+    """Return every combination of a global ``levels`` value and per-ticker ``overrides``."""
+    overrides = {t: list(v) for t, v in (overrides or {}).items()}
+    tickers = list(overrides)
+    configs = []
+    for level in dict.fromkeys(levels):
+        for combo in itertools.product(*(overrides[t] for t in tickers)):
+            configs.append({"stop_loss": float(level), "overrides": dict(zip(tickers, map(float, combo)))})
+    return configs
+
+
+def _window(directory: Path, tickers: Sequence[str], start: str, end: str) -> np.ndarray:
+    """Return forward-filled closes (days x ``tickers``) between ``start`` and ``end``."""
+    matrix = price_matrix.PriceMatrix.open(directory)
+    dates = pd.DatetimeIndex(matrix.dates)
+    cols = np.flatnonzero((dates >= pd.Timestamp(start)) & (dates <= pd.Timestamp(end)))
+    present = [t for t in tickers if t in matrix.rows]
+    closes = pd.DataFrame(np.nan, index=dates[cols], columns=list(dict.fromkeys(tickers)))
+    if present:
+        rows = [matrix.rows[t] for t in present]
+        closes[present] = matrix.values[rows][:, cols].T
+    # Days where every ticker is missing were not trading days for this portfolio
+    closes = closes.dropna(how="all").ffill()
+    return closes[list(tickers)].to_numpy(dtype=np.float64)
+
+
+def _init_worker(directory: Path, positions: Dict[str, list], cash: float, start: str, end: str) -> None:
+    _state.update(positions)
+    _state["cash"] = cash
+    _state["closes"] = _window(directory, positions["ticker"], start, end)
+
+
+def _evaluate(configs: List[Dict]) -> List[Dict]:
+    closes = _state["closes"]
+    tickers = _state["ticker"]
+    shares = np.asarray(_state["shares"], dtype=np.int64)
+    buy_price = np.asarray(_state["buy_price"], dtype=np.float64)
+    cash = _state["cash"]
+    start_equity = cash + np.nansum(np.round(closes[0] * shares, 2)) if len(closes) else cash
+
+    rows = []
+    for config in configs:
+        levels = np.array([config["overrides"].get(t, config["stop_loss"]) for t in tickers])
+        result = simulate(closes, shares, buy_price, np.round(buy_price * (1 - levels), 2), cash)
+        equity = result["equity"]
+        peak = np.maximum.accumulate(equity) if len(equity) else equity
+        drawdown = float(np.max(1 - equity / peak)) if len(equity) else 0.0
+        rows.append({
+            "stop_loss": config["stop_loss"],
+            "overrides": ",".join(f"{t}={v:g}" for t, v in config["overrides"].items()),
+            "final_equity": round(float(equity[-1]), 2) if len(equity) else round(cash, 2),
+            "max_drawdown": round(drawdown, 4),
+            "turnover": round(float(result["proceeds"].sum() / start_equity), 4) if start_equity else 0.0,
+            "sells": int((result["sold_day"] < len(closes)).sum()),
+        })
+    return rows
+
+
+def sweep(
+    portfolio: pd.DataFrame,
+    cash: float,
+    start: str,
+    end: str,
+    configs: Sequence[Dict],
+    *,
+    directory: Optional[Path] = None,
+    workers: Optional[int] = None,
+    chunk_size: int = CHUNK_SIZE,
+) -> pd.DataFrame:
+    """Evaluate ``configs`` for ``portfolio`` and rank them by final equity.
+
+    Prices come from the price matrix in ``directory``, which must already
+    hold the portfolio's tickers (see :func:`price_matrix.refresh`).
+    Drawdown is the largest fall from a previous equity peak and turnover
+    is the value sold divided by the starting equity.
+    """
+    directory = directory or price_matrix.default_dir()
+    portfolio = portfolio.dropna(subset=["shares", "buy_price", "stop_loss"]).reset_index(drop=True)
+    positions = {
+        "ticker": portfolio["ticker"].tolist(),
+        "shares": portfolio["shares"].astype(int).tolist(),
+        "buy_price": portfolio["buy_price"].astype(float).tolist(),
+    }
+    chunks = [list(configs[i:i + chunk_size]) for i in range(0, len(configs), chunk_size)]
+    max_workers = workers or min(len(chunks), os.cpu_count() or 1) or 1
+
+    rows: List[Dict] = []
+    with ProcessPoolExecutor(
+        max_workers=max_workers,
+        initializer=_init_worker,
+        initargs=(directory, positions, cash, start, end),
+    ) as pool:
+        for result in pool.map(_evaluate, chunks):
+            rows.extend(result)
+
+    table = pd.DataFrame(rows, columns=["stop_loss", "overrides", "final_equity", "max_drawdown", "turnover", "sells"])
+    table = table.sort_values(["final_equity", "max_drawdown"], ascending=[False, True], ignore_index=True)
+    table.index = table.index + 1
+    table.index.name = "rank"
+    return table
+
+
+def _parse_override(text: str) -> tuple:
+    ticker, _, levels = text.partition("=")
+    if not levels:
+        raise argparse.ArgumentTypeError(f"expected TICKER=LEVEL[,LEVEL...], got {text!r}")
+    return ticker, [float(v) for v in levels.split(",")]
+
+
+def main(argv: Iterable[str] | None = None) -> None:
+    # Imported here to avoid a circular import with ``trading``
+    from .trading import _load_portfolio, load_config
+
+    parser = argparse.ArgumentParser(prog="trading sweep",
+                                     description="Rank stop-loss settings over cached prices")
+    parser.add_argument("--portfolio", required=True,
+                        help="CSV with columns ticker, shares, stop_loss, buy_price")
+    parser.add_argument("--start", required=True, help="First day (YYYY-MM-DD)")
+    parser.add_argument("--end", required=True, help="Last day (YYYY-MM-DD)")
+    parser.add_argument("--levels", type=float, nargs="+", required=True,
+                        help="Stop-loss levels below the buy price (0.05 = 5%%)")
+    parser.add_argument("--override", type=_parse_override, action="append", default=[],
+                        help="Per-ticker levels to try, e.g. ABEO=0.05,0.1 (repeatable)")
+    parser.add_argument("--cash", type=float, help="Starting cash value")
+    parser.add_argument("--config", default="config.yaml",
+                        help="Path to YAML/JSON configuration file")
+    parser.add_argument("--workers", type=int, help="Worker processes")
+    parser.add_argument("--top", type=int, default=20, help="Rows of the ranking to print")
+    parser.add_argument("--output", help="Write the full ranking to this CSV")
+    args = parser.parse_args(list(argv) if argv is not None else None)
+
+    config = load_config(args.config)
+    portfolio, cash = _load_portfolio(args.portfolio, args.cash, config)
+    tickers = portfolio["ticker"].tolist()
+    # Fill the price store for the range, then the shared matrix from it
+    load_closes(tickers, args.start, args.end)
+    price_matrix.refresh(tickers)
+
+    configs = grid(args.levels, dict(args.override))
+    table = sweep(portfolio, cash, args.start, args.end, configs, workers=args.workers)
+    if args.output:
+        table.to_csv(args.output)
+    print(table.head(args.top).to_string())
+
+
+if __name__ == "__main__":
+    main()
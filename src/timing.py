@@ -0,0 +1,70 @@
+"""Per-stage timings and counters for a trading run."""
+
+from __future__ import annotations
+
+import json
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional
+
+# Rolling history of run reports, one JSON object per line
+HISTORY_FILE = Path(__file__).resolve().parents[1] / "run_history.jsonl"
+
+# Number of runs kept in the history file
+HISTORY_LIMIT = 500
+
+
+class RunTimer:
+    """Collect stage durations from a monotonic clock plus named counters."""
+
+    def __init__(self) -> None:
+        self.started = datetime.utcnow()
+        self._t0 = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+        self.counters: Dict[str, int] = {}
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Time the enclosed block as stage ``name``."""
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - t0
+
+    def count(self, name: str, value: int = 1) -> None:
+        """Add ``value`` to counter ``name``."""
+        self.counters[name] = self.counters.get(name, 0) + int(value)
+
+    def report(self) -> Dict[str, Any]:
+        """Return the timings and counters collected so far."""
+        return {
+            "started": self.started.isoformat(),
+            "total_seconds": round(time.perf_counter() - self._t0, 4),
+            "stages": {name: round(seconds, 4) for name, seconds in self.stages.items()},
+            "counters": dict(self.counters),
+        }
+
+
+def append_history(report: Dict[str, Any], path: Path = HISTORY_FILE, limit: Optional[int] = HISTORY_LIMIT) -> None:
+    """Append ``report`` to the history at ``path``, keeping the last ``limit`` runs."""
+    with path.open("a") as f:
+        f.write(json.dumps(report) + "\n")
+    if limit is None:
+        return
+    with path.open() as f:
+        lines = f.readlines()
+    if len(lines) > limit:
+        tmp = path.with_name(f".{path.name}.tmp")
+        tmp.write_text("".join(lines[-limit:]))
+        tmp.replace(path)
+
+
+def read_history(path: Path = HISTORY_FILE) -> list:
+    """Return the run reports in the history at ``path``, oldest first."""
+    if not path.exists():
+        return []
+    with path.open() as f:
+        return [json.loads(line) for line in f if line.strip()]
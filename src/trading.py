@@ -3,52 +3,68 @@ from __future__ import annotations
 
 import argparse
 import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 from pathlib import Path
 from typing import Iterable
 
 import pandas as pd
-import yaml
 
-from .portfolio import Portfolio
-from .generate_graph import generate_graph
-from .cache import get_price_data
+from .portfolio import Portfolio, ledger
+from .generate_graph import update_graph
+from . import cache, price_context, price_matrix, settings
+from .price_context import PriceContext
+from .timing import RunTimer, append_history
 
 # Location of status json relative to project root
 STATUS_FILE = Path(__file__).resolve().parents[1] / "bot_status.json"
 
 
-def _write_status(action: str, file: Path = STATUS_FILE) -> None:
-    """Write the last action message to ``file``."""
+def _write_status(action: str, file: Path = STATUS_FILE, timing: dict | None = None) -> None:
+    """Write the last action message and the run's ``timing`` report to ``file``."""
     data = {"last_action": action, "time": datetime.utcnow().isoformat()}
+    if timing is not None:
+        data["timing"] = timing
     with file.open("w") as f:
         json.dump(data, f)
 
 
 def load_config(path: str) -> dict:
     """Load YAML or JSON configuration file."""
-    with open(path, "r") as f:
-        if path.endswith(".json"):
-            return json.load(f)
-        return yaml.safe_load(f)
+    if not os.path.exists(path):
+        raise FileNotFoundError(path)
+    return settings.config(path).as_dict()
 
 
 def daily_results(chatgpt_portfolio: Iterable[dict] | pd.DataFrame,
                   extra_tickers: Iterable[str],
-                  today: str) -> None:
-    """Print daily price information for tickers."""
+                  today: str,
+                  prices: PriceContext | None = None) -> None:
+    """Print daily price information for tickers.
+
+    ``prices`` is the run's price context; one is built when not given.
+    """
     if isinstance(chatgpt_portfolio, pd.DataFrame):
         chatgpt_portfolio = chatgpt_portfolio.to_dict(orient="records")
+    chatgpt_portfolio = list(chatgpt_portfolio)
     print(f"prices and updates for {today}")
-    for stock in list(chatgpt_portfolio) + [{"ticker": t} for t in extra_tickers]:
-        ticker = stock["ticker"]
-        data = get_price_data(ticker, period="2d", date=today)
+    tickers = [stock["ticker"] for stock in chatgpt_portfolio] + list(extra_tickers)
+    prices = price_context.ensure(prices, tickers, today)
+    for ticker in tickers:
+        data = prices.bars(ticker, 2) if ticker in prices else pd.DataFrame()
 
-        # ``get_price_data`` may sometimes return fewer than two rows (for
+        # The context may hold fewer than two rows for a ticker (for
         # example around holidays or for recently listed tickers). Using
         # ``iloc[-2:]`` followed by ``squeeze`` would return a Series when two
         # rows are present which cannot be directly converted to ``float``.
-        close_prices = data["Close"].dropna()
+        # A ticker that could not be priced has no rows at all.
+        close_prices = data["Close"].dropna() if "Close" in data else pd.Series(dtype=float)
+        if close_prices.empty:
+            print(f"{ticker}: no price data, skipping")
+            continue
         price = float(close_prices.iloc[-1])
         if len(close_prices) >= 2:
             last_price = float(close_prices.iloc[-2])
@@ -67,11 +83,10 @@ def daily_results(chatgpt_portfolio: Iterable[dict] | pd.DataFrame,
     final_equity = chatgpt_totals.loc[chatgpt_totals["Date"] == final_date, "Total Equity"].iloc[0]
     print(f"Latest ChatGPT Equity: ${final_equity:.2f}")
 
-    russell = get_price_data(
+    russell = prices.range(
         "^RUT",
-        date=today,
-        start="2025-06-27",
-        end=final_date + pd.Timedelta(days=1),
+        price_context.BENCHMARK_START,
+        final_date + pd.Timedelta(days=1),
     ).reset_index()[["Date", "Close"]]
 
     # ``russell`` is a DataFrame with a single ``Close`` column. To compute the
@@ -87,70 +102,222 @@ def daily_results(chatgpt_portfolio: Iterable[dict] | pd.DataFrame,
     print(f"today's portfolio: {chatgpt_portfolio}")
 
 
-def run(portfolio_path: str, cash: float | None, config_path: str, *, today: str | None = None) -> None:
-    """Execute the trading logic."""
+def _load_portfolio(portfolio_path: str, cash: float | None, config: dict) -> tuple[pd.DataFrame, float]:
+    """Return the positions in ``portfolio_path`` and the cash to start from."""
+    default_stop = config.get("default_stop_loss")
+    if "Date" in pd.read_csv(portfolio_path, nrows=0).columns:
+        # A portfolio update CSV: take the current positions from the ledger
+        current = ledger.get_ledger(portfolio_path)
+        portfolio_df = ledger.normalize_positions(current.to_frame(), default_stop)
+        if cash is None and current.date is not None:
+            cash = current.cash
+    else:
+        portfolio_df = ledger.normalize_positions(pd.read_csv(portfolio_path), default_stop)
+    cash = cash if cash is not None else config.get("default_cash", 0.0)
+    return portfolio_df, cash
+
+
+def _make_portfolio(config: dict, today: str, **paths) -> Portfolio:
+    return Portfolio(
+        today=today,
+        concurrency=config.get("fetch_concurrency", 4),
+        timeout=config.get("fetch_timeout", 30.0),
+        retries=config.get("fetch_retries", 2),
+        pnl_method=config.get("pnl_method"),
+        **paths,
+    )
+
+
+def run(portfolio_path: str, cash: float | None, config_path: str, *, today: str | None = None) -> dict:
+    """Execute the trading logic and return the timing report of the run."""
     today = today or datetime.today().strftime("%Y-%m-%d")
+    timer = RunTimer()
+    stats_before = cache.cache_stats()
 
-    config = load_config(config_path)
-    cash = cash if cash is not None else config.get("default_cash", 0.0)
-    extra_tickers = config.get("extra_tickers", ["^RUT", "IWO", "XBI"])
-    default_stop = config.get("default_stop_loss")
+    with timer.stage("load"):
+        config = load_config(config_path)
+        extra_tickers = config.get("extra_tickers", ["^RUT", "IWO", "XBI"])
+        portfolio_df, cash = _load_portfolio(portfolio_path, cash, config)
+    tickers = portfolio_df["ticker"].tolist() + list(extra_tickers)
+    timer.count("positions", len(portfolio_df))
+    timer.count("tickers", len(set(tickers)))
+
+    # Every stage below reads its prices from this one fetch
+    portfolio = _make_portfolio(config, today)
+    with timer.stage("fetch"):
+        prices = PriceContext.build(tickers, today=today, portfolio=portfolio)
+
+    with timer.stage("process"):
+        portfolio.process(portfolio_df, cash, prices)
+    timer.count("rows_written", portfolio.rows_written)
+    with timer.stage("daily_results"):
+        daily_results(portfolio_df, extra_tickers, today, prices)
+    with timer.stage("price_matrix"):
+        price_matrix.refresh(tickers)
+
+    with timer.stage("graph"):
+        _, rendered = update_graph(Path("graphs"), f"performance_{today}.png", prices)
+    timer.count("graphs_rendered", rendered)
+
+    stats = cache.cache_stats()
+    for key in ("hits", "misses", "downloads", "downloaded_tickers"):
+        timer.count(f"cache_{key}", stats[key] - stats_before[key])
+    report = timer.report()
+    _write_status("trading script executed", timing=report)
+    try:
+        append_history(report)
+    except OSError as exc:
+        print(f"Warning: could not write run history: {exc}")
+    return report
 
-    portfolio_df = pd.read_csv(portfolio_path)
-    # Normalize common column names to match the expected lowercase format
-    rename_map = {
-        "Ticker": "ticker",
-        "Shares": "shares",
-        "Stop Loss": "stop_loss",
-        "Buy Price": "buy_price",
-        "Cost Basis": "cost_basis",
+
+def _process_portfolio(job: dict) -> dict:
+    """Process one portfolio of :func:`run_many` in a worker process."""
+    started = time.perf_counter()
+    cache.CACHE_DIR = Path(job["cache_dir"])
+    out = Path(job["out_dir"])
+    out.mkdir(parents=True, exist_ok=True)
+    portfolio = _make_portfolio(
+        job["config"],
+        job["today"],
+        portfolio_file=(out / "chatgpt_portfolio_update.csv").as_posix(),
+        trade_log=(out / "chatgpt_trade_log.csv").as_posix(),
+    )
+    portfolio.process(job["positions"], job["cash"], job["prices"])
+    return {
+        "portfolio": job["name"],
+        "positions": len(job["positions"]),
+        "rows_written": portfolio.rows_written,
+        "output": out.as_posix(),
+        "seconds": time.perf_counter() - started,
     }
-    for old, new in rename_map.items():
-        if old in portfolio_df.columns and new not in portfolio_df.columns:
-            portfolio_df = portfolio_df.rename(columns={old: new})
-
-    # Remove summary rows like "TOTAL" and any rows missing share counts
-    if "ticker" in portfolio_df.columns:
-        portfolio_df = portfolio_df[~portfolio_df["ticker"].str.upper().eq("TOTAL")]
-    if "shares" in portfolio_df.columns:
-        portfolio_df = portfolio_df[portfolio_df["shares"].notna()]
-
-    # Derive missing buy price from cost basis and shares
-    if "buy_price" not in portfolio_df.columns and {
-        "cost_basis",
-        "shares",
-    }.issubset(portfolio_df.columns):
-        with pd.option_context("mode.chained_assignment", None):
-            portfolio_df["buy_price"] = portfolio_df["cost_basis"] / portfolio_df[
-                "shares"
-            ]
-    if default_stop is not None:
-        if "stop_loss" not in portfolio_df.columns:
-            portfolio_df["stop_loss"] = default_stop
+
+
+def _format_timing(report: dict) -> str:
+    lines = [
+        f"Processed {len(report['portfolios'])} portfolios: {report['counters']['tickers']} tickers "
+        f"fetched in {report['stages']['fetch']:.2f}s, {report['total_seconds']:.2f}s total"
+    ]
+    for row in report["portfolios"]:
+        if "error" in row:
+            lines.append(f"  {row['portfolio']}: failed: {row['error']}")
         else:
-            portfolio_df["stop_loss"] = portfolio_df["stop_loss"].fillna(default_stop)
+            lines.append(
+                f"  {row['portfolio']}: {row['positions']} positions in "
+                f"{row['seconds']:.2f}s -> {row['output']}"
+            )
+    return "\n".join(lines)
+
+
+def _load_jobs(portfolio_paths: Iterable[str], cash: float | None, config: dict, today: str, out_dir: str) -> list:
+    jobs = []
+    for path in portfolio_paths:
+        name = Path(path).stem
+        if any(job["name"] == name for job in jobs):
+            raise ValueError(f"Duplicate portfolio name: {name}")
+        positions, start_cash = _load_portfolio(path, cash, config)
+        jobs.append({
+            "name": name,
+            "positions": positions,
+            "cash": start_cash,
+            "config": config,
+            "today": today,
+            "out_dir": (Path(out_dir) / name).as_posix(),
+            "cache_dir": cache.CACHE_DIR.as_posix(),
+        })
+    return jobs
+
 
-    portfolio = Portfolio(today=today)
-    portfolio.process(portfolio_df, cash)
-    daily_results(portfolio_df, extra_tickers, today)
+def run_many(
+    portfolio_paths: Iterable[str],
+    config_path: str,
+    *,
+    cash: float | None = None,
+    out_dir: str = "portfolios",
+    today: str | None = None,
+    workers: int | None = None,
+) -> dict:
+    """Process several portfolios in parallel after one shared price fetch.
 
-    graphs_dir = Path("graphs")
-    graphs_dir.mkdir(exist_ok=True)
-    graph_file = graphs_dir / f"performance_{today}.png"
-    generate_graph(graph_file.as_posix(), show=False)
-    _write_status("trading script executed")
+    Prices for the union of all tickers are fetched once and each
+    portfolio is then processed in a worker process that is handed its
+    share of them.  Results for ``path/to/name.csv`` are written to
+    ``out_dir/name/``.  Returns the timing report, which is also printed.
+    """
+    today = today or datetime.today().strftime("%Y-%m-%d")
+    timer = RunTimer()
+    stats_before = cache.cache_stats()
+    with timer.stage("load"):
+        config = load_config(config_path)
+        extra_tickers = list(config.get("extra_tickers", ["^RUT", "IWO", "XBI"]))
+        jobs = _load_jobs(portfolio_paths, cash, config, today, out_dir)
+
+    tickers = list(dict.fromkeys(t for job in jobs for t in job["positions"]["ticker"]))
+    timer.count("tickers", len(tickers))
+    with timer.stage("fetch"):
+        prices = PriceContext.build(
+            tickers, today=today, benchmarks=(), portfolio=_make_portfolio(config, today)
+        )
+    for job in jobs:
+        job["prices"] = prices.subset(job["positions"]["ticker"])
+
+    rows = []
+    max_workers = workers or min(len(jobs), os.cpu_count() or 1) or 1
+    with timer.stage("process"), ProcessPoolExecutor(max_workers=max_workers) as pool:
+        futures = [(job["name"], pool.submit(_process_portfolio, job)) for job in jobs]
+        for name, future in futures:
+            try:
+                rows.append(future.result())
+            except Exception as exc:
+                rows.append({"portfolio": name, "error": str(exc)})
+    timer.count("rows_written", sum(row.get("rows_written", 0) for row in rows))
+
+    with timer.stage("price_matrix"):
+        price_matrix.refresh(tickers + extra_tickers)
+
+    stats = cache.cache_stats()
+    for key in ("hits", "misses", "downloads", "downloaded_tickers"):
+        timer.count(f"cache_{key}", stats[key] - stats_before[key])
+    report = timer.report()
+    report["portfolios"] = rows
+    print(_format_timing(report))
+    _write_status(f"processed {len(jobs)} portfolios", timing=report)
+    try:
+        append_history(report)
+    except OSError as exc:
+        print(f"Warning: could not write run history: {exc}")
+    return report
 
 
 def main(argv: Iterable[str] | None = None) -> None:
+    argv = list(argv) if argv is not None else sys.argv[1:]
+    if argv[:1] == ["backtest"]:
+        from . import backtest
+        backtest.main(argv[1:])
+        return
+    if argv[:1] == ["sweep"]:
+        from . import sweep
+        sweep.main(argv[1:])
+        return
+
     parser = argparse.ArgumentParser(description="Process portfolio updates")
-    parser.add_argument("--portfolio", required=True,
-                        help="CSV with columns ticker, shares, stop_loss, buy_price")
+    parser.add_argument("--portfolio", required=True, nargs="+",
+                        help="CSV with columns ticker, shares, stop_loss, buy_price; "
+                             "several files are processed in parallel")
     parser.add_argument("--cash", type=float, help="Starting cash value")
     parser.add_argument("--config", default="config.yaml",
                         help="Path to YAML/JSON configuration file")
-    args = parser.parse_args(list(argv) if argv is not None else None)
+    parser.add_argument("--out-dir", default="portfolios",
+                        help="Output directory when processing several portfolios")
+    parser.add_argument("--workers", type=int,
+                        help="Worker processes when processing several portfolios")
+    args = parser.parse_args(argv)
 
-    run(args.portfolio, args.cash, args.config)
+    if len(args.portfolio) > 1:
+        run_many(args.portfolio, args.config, cash=args.cash,
+                 out_dir=args.out_dir, workers=args.workers)
+    else:
+        run(args.portfolio[0], args.cash, args.config)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,272 @@
+"""Intraday stop-loss watcher.
+
+Polls batched quotes for the positions in the shared ledger every
+``watch_interval`` seconds while the market is open.  Positions sit in a
+min-heap keyed on their cushion above the stop (``price / stop - 1``); a
+quote only pushes a new key when the price changed, and each tick pops
+entries until the top one still has a positive cushion, so only breached
+stops are examined.  Breached positions go through
+:meth:`Portfolio.log_sells` and the day's portfolio update is rewritten at
+the quoted prices.
+
+The watcher is opt-in.  Run it on its own with ``python -m src.watcher``;
+the dashboard starts it alongside the scheduler only when ``watch_interval``
+in ``config.yaml`` is above 0 (the shipped default is 0).
+"""
+
+from __future__ import annotations
+
+import argparse
+import heapq
+from datetime import date, datetime, time as dtime
+from pathlib import Path
+from threading import Event, Thread
+from typing import Dict, Iterable, List, Mapping, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+import pandas as pd
+
+from . import settings
+from .portfolio import Portfolio, history, ledger
+from .portfolio.ledger import Ledger, Position
+from .providers import get_provider
+
+CONFIG_FILE = settings.CONFIG_FILE
+
+REASON = "SELL - Intraday Stop Loss Triggered"
+
+# Tickers per quote request
+BATCH_SIZE = 200
+
+# Columns of a day in the portfolio update CSV
+_UPDATE_COLUMNS = [
+    "Date", "Ticker", "Shares", "Cost Basis", "Stop Loss", "Current Price",
+    "Total Value", "PnL", "Action", "Cash Balance", "Total Equity",
+]
+
+_MARKET_TZ = ZoneInfo("America/New_York")
+_OPEN, _CLOSE = dtime(9, 30), dtime(16, 0)
+
+# NYSE full-day closures.  Extend this when a new year's calendar is
+# published; early closes (1 pm) are not modelled, so the watcher keeps
+# polling stale quotes until 4 pm on those days.
+MARKET_HOLIDAYS = frozenset(date.fromisoformat(d) for d in (
+    "2025-01-01", "2025-01-09", "2025-01-20", "2025-02-17", "2025-04-18",
+    "2025-05-26", "2025-06-19", "2025-07-04", "2025-09-01", "2025-11-27",
+    "2025-12-25",
+    "2026-01-01", "2026-01-19", "2026-02-16", "2026-04-03", "2026-05-25",
+    "2026-06-19", "2026-07-03", "2026-09-07", "2026-11-26", "2026-12-25",
+))
+
+
+def market_open(now: Optional[datetime] = None) -> bool:
+    """Return whether US equity markets are in regular trading hours."""
+    now = (now or datetime.now(_MARKET_TZ)).astimezone(_MARKET_TZ)
+    if now.weekday() >= 5 or now.date() in MARKET_HOLIDAYS:
+        return False
+    return _OPEN <= now.time() < _CLOSE
+
+
+class StopLossWatcher:
+    """Sell positions from the ledger at ``portfolio_file`` once their stop is hit."""
+
+    def __init__(self, portfolio_file: str | Path = ledger.PORTFOLIO_FILE, *, interval: float = 60.0) -> None:
+        self.portfolio_file = portfolio_file
+        self.interval = interval
+        self._book: Optional[Ledger] = None
+        self._positions: Dict[str, Position] = {}
+        # Min-heap of ``(cushion, version, ticker)``; entries whose version
+        # is older than ``_versions[ticker]`` are stale and skipped.
+        self._heap: List[Tuple[float, int, str]] = []
+        self._versions: Dict[str, int] = {}
+        self._last: Dict[str, float] = {}
+
+    # ---- heap maintenance ---------------------------------------------
+
+    def _push(self, ticker: str, price: float) -> None:
+        version = self._versions.get(ticker, 0) + 1
+        self._versions[ticker] = version
+        cushion = price / self._positions[ticker].stop_loss - 1
+        heapq.heappush(self._heap, (cushion, version, ticker))
+
+    def _rebuild(self) -> None:
+        self._heap = []
+        for ticker, price in self._last.items():
+            if ticker in self._positions:
+                self._push(ticker, price)
+
+    def sync(self) -> None:
+        """Pick up a ledger replaced by a portfolio update or a manual trade."""
+        book = ledger.get_ledger(self.portfolio_file)
+        if book is self._book:
+            return
+        self._book = book
+        self._positions = {p.ticker: p for p in book if p.stop_loss and p.stop_loss > 0}
+        self._last = {t: p for t, p in self._last.items() if t in self._positions}
+        self._rebuild()
+
+    @property
+    def tickers(self) -> List[str]:
+        return list(self._positions)
+
+    def breached(self, quotes: Mapping[str, float]) -> List[str]:
+        """Apply ``quotes`` and return the tickers now at or below their stop."""
+        for ticker, price in quotes.items():
+            if ticker not in self._positions or price != price:
+                continue
+            price = round(float(price), 2)
+            if self._last.get(ticker) == price:
+                continue
+            self._last[ticker] = price
+            self._push(ticker, price)
+
+        hits: List[str] = []
+        while self._heap and self._heap[0][0] <= 0:
+            _, version, ticker = heapq.heappop(self._heap)
+            if version == self._versions.get(ticker) and ticker in self._positions:
+                hits.append(ticker)
+                del self._positions[ticker]
+        if len(self._heap) > 4 * max(len(self._positions), 16):
+            self._rebuild()
+        return hits
+
+    # ---- polling ------------------------------------------------------
+
+    def _quotes(self) -> Dict[str, float]:
+        tickers = self.tickers
+        prices: Dict[str, float] = {}
+        provider = get_provider()
+        for i in range(0, len(tickers), BATCH_SIZE):
+            try:
+                prices.update(provider.quotes(tickers[i:i + BATCH_SIZE]))
+            except Exception as exc:
+                print(f"Warning: quote request failed: {exc}")
+        return prices
+
+    def _day_rows(self, book: Ledger, sales: List[tuple], today: str) -> pd.DataFrame:
+        """Return today's portfolio update rows for ``book`` after ``sales``.
+
+        Held positions are priced at their last quote, or at the last written
+        price when they were not quoted.  Sells already written for today
+        are kept, followed by one row per sale in ``sales``.
+        """
+        path = Path(self.portfolio_file)
+        previous = pd.DataFrame()
+        if path.exists() and path.stat().st_size:
+            previous = history.read_latest_day(str(path))
+        written: Dict[str, float] = {}
+        rows: List[dict] = []
+        if not previous.empty:
+            same_day = str(previous["Date"].iloc[-1]) == today
+            previous = previous[previous["Ticker"].astype(str).str.upper() != "TOTAL"]
+            if "Current Price" in previous:
+                prices = pd.to_numeric(previous["Current Price"], errors="coerce")
+                written = {t: p for t, p in zip(previous["Ticker"], prices) if p == p}
+            if same_day and "Action" in previous:
+                sold = previous["Action"].fillna("").astype(str).str.startswith("SELL")
+                rows = previous[sold].to_dict(orient="records")
+
+        total_value = total_pnl = 0.0
+        for position in book:
+            price = self._last.get(position.ticker, written.get(position.ticker))
+            shares = int(position.shares)
+            if price is None:
+                value = pnl = float("nan")
+                action = "HOLD - No Price"
+            else:
+                value = round(price * shares, 2)
+                pnl = round((price - position.buy_price) * shares, 2)
+                action = "HOLD"
+                total_value += value
+                total_pnl += pnl
+            rows.append({
+                "Date": today, "Ticker": position.ticker, "Shares": shares,
+                "Cost Basis": position.buy_price, "Stop Loss": position.stop_loss,
+                "Current Price": price, "Total Value": value, "PnL": pnl,
+                "Action": action, "Cash Balance": "", "Total Equity": "",
+            })
+        for ticker, shares, price, cost, pnl, reason in sales:
+            rows.append({
+                "Date": today, "Ticker": ticker, "Shares": shares, "Cost Basis": cost,
+                "Stop Loss": self._book.positions[ticker].stop_loss, "Current Price": price,
+                "Total Value": round(price * shares, 2), "PnL": pnl, "Action": reason,
+                "Cash Balance": "", "Total Equity": "",
+            })
+        rows.append({
+            "Date": today, "Ticker": "TOTAL", "Shares": "", "Cost Basis": "",
+            "Stop Loss": "", "Current Price": "", "Total Value": round(total_value, 2),
+            "PnL": round(total_pnl, 2), "Action": "", "Cash Balance": round(book.cash, 2),
+            "Total Equity": round(total_value + book.cash, 2),
+        })
+        return pd.DataFrame(rows, columns=_UPDATE_COLUMNS)
+
+    def _sell(self, tickers: Iterable[str]) -> None:
+        # Sales go to a copy; the shared ledger is replaced by ``record_day``
+        # only once today's update has been written.
+        book = self._book.copy()
+        portfolio = Portfolio(portfolio_file=str(self.portfolio_file))
+        sales = []
+        for ticker in tickers:
+            position = book.positions[ticker]
+            price = self._last[ticker]
+            shares = int(position.shares)
+            pnl = round((price - position.buy_price) * shares, 2)
+            sales.append((ticker, shares, price, position.buy_price, pnl, REASON))
+            book.sell(ticker, position.shares, price)
+        # Rewrite today's update from the book at the quoted prices rather
+        # than re-pricing it, so only the quoted sales are recorded
+        rows = self._day_rows(book, sales, portfolio.today)
+        history.write_day(portfolio.portfolio_file, portfolio.today, rows)
+        ledger.record_day(portfolio.portfolio_file, rows)
+        portfolio.log_sells(sales)
+
+    def poll(self) -> List[str]:
+        """Run one check and return the tickers that were sold."""
+        self.sync()
+        if not self._positions:
+            return []
+        hits = self.breached(self._quotes())
+        if hits:
+            self._sell(hits)
+            self.sync()
+        return hits
+
+    def run(self, stop_event: Optional[Event] = None) -> None:
+        """Poll every ``interval`` seconds during market hours until ``stop_event`` is set."""
+        stop_event = stop_event or Event()
+        while not stop_event.is_set():
+            if market_open():
+                try:
+                    self.poll()
+                except Exception as exc:
+                    print(f"Stop-loss watcher failed: {exc}")
+            stop_event.wait(self.interval)
+
+
+def load_interval(config_file: Path = CONFIG_FILE) -> float:
+    """Return ``watch_interval`` from ``config_file`` (0 when unset)."""
+    return settings.config(config_file).get_float("watch_interval", 0.0)
+
+
+def start(interval: float, stop_event: Event, portfolio_file: str | Path = ledger.PORTFOLIO_FILE) -> Thread:
+    """Run a watcher in a daemon thread until ``stop_event`` is set."""
+    watcher = StopLossWatcher(portfolio_file, interval=interval)
+    thread = Thread(target=watcher.run, args=(stop_event,), daemon=True)
+    thread.start()
+    return thread
+
+
+def main(argv: Iterable[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Watch stop losses during market hours")
+    parser.add_argument("--config", default=CONFIG_FILE.as_posix(),
+                        help="Path to YAML configuration file")
+    parser.add_argument("--interval", type=float,
+                        help="Seconds between quote polls (defaults to watch_interval)")
+    args = parser.parse_args(list(argv) if argv is not None else None)
+
+    interval = args.interval or load_interval(Path(args.config)) or 60.0
+    StopLossWatcher(interval=interval).run()
+
+
+if __name__ == "__main__":
+    main()
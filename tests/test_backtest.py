@@ -0,0 +1,66 @@
+import pathlib
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+
+from src import backtest, trading
+from src.portfolio import Portfolio
+
+
+def _replay(portfolio, cash, closes):
+    """Run the daily update once per day, the way the live script would."""
+    totals, sales = [], []
+    for date, row in closes.iterrows():
+        pf = Portfolio(today=date.strftime("%Y-%m-%d"))
+        price_map = {t: pd.DataFrame({"Close": [row[t]]}) for t in closes if row[t] == row[t]}
+        df, sold = pf._evaluate(portfolio, price_map, cash)
+        total = df.iloc[-1]
+        totals.append([total["Total Value"], total["PnL"], total["Cash Balance"], total["Total Equity"]])
+        sales += [(pf.today, s[0], s[2]) for s in sold]
+        portfolio = portfolio[~portfolio["ticker"].isin([s[0] for s in sold])]
+        cash = total["Cash Balance"]
+    return totals, sales
+
+
+def test_backtest_matches_daily_updates():
+    rng = np.random.default_rng(0)
+    index = pd.bdate_range("2025-07-01", periods=30, name="Date")
+    walk = 10 + np.cumsum(rng.normal(0, 0.4, size=(30, 4)), axis=0)
+    closes = pd.DataFrame(walk, index=index, columns=["AAA", "BBB", "CCC", "DDD"])
+    closes.iloc[:5, 3] = np.nan
+    portfolio = pd.DataFrame({
+        "ticker": ["AAA", "BBB", "CCC", "DDD"],
+        "shares": [10, 5, 3, 7],
+        "buy_price": [10.0, 9.5, 10.2, 10.0],
+        "stop_loss": [9.0, 9.8, 5.0, 9.5],
+    })
+
+    daily, trades = backtest.backtest(portfolio, 50.0, "2025-07-01", "2025-08-11", closes=closes)
+    totals, sales = _replay(portfolio, 50.0, closes)
+
+    np.testing.assert_allclose(
+        daily[["Total Value", "PnL", "Cash Balance", "Total Equity"]].to_numpy(dtype=float), totals
+    )
+    assert list(zip(trades["Date"], trades["Ticker"], trades["Sell Price"])) == sorted(sales)
+    assert not trades.empty
+
+
+def test_trading_main_dispatches_backtest(monkeypatch):
+    seen = []
+    monkeypatch.setattr(backtest, "main", lambda argv: seen.append(argv))
+    trading.main(["backtest", "--portfolio", "p.csv", "--start", "2025-07-01", "--end", "2025-08-01"])
+    assert seen == [["--portfolio", "p.csv", "--start", "2025-07-01", "--end", "2025-08-01"]]
+
+
+def test_backtest_keeps_positions_with_unrelated_blanks():
+    index = pd.bdate_range("2025-07-01", periods=3, name="Date")
+    closes = pd.DataFrame({"AAA": [10.0, 11.0, 12.0]}, index=index)
+    portfolio = pd.DataFrame({
+        "ticker": ["AAA"], "shares": [2], "buy_price": [10.0], "stop_loss": [5.0],
+        "cost_basis": [np.nan],
+    })
+    daily, _ = backtest.backtest(portfolio, 0.0, "2025-07-01", "2025-07-03", closes=closes)
+    assert list(daily["Total Value"]) == [20.0, 22.0, 24.0]
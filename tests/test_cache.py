@@ -0,0 +1,221 @@
+import os
+import pathlib
+import sys
+import threading
+import time
+
+import pandas as pd
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+
+from src import cache, providers
+
+
+def _fake_download(calls):
+    def download(ticker, start=None, end=None, progress=False, **kwargs):
+        calls.append((ticker, start, end))
+        index = pd.bdate_range(start, pd.Timestamp(end) - pd.Timedelta(days=1), name="Date")
+        return pd.DataFrame(
+            {"Close": [float(d.day) for d in index], "Volume": [100.0] * len(index)},
+            index=index,
+        )
+    return download
+
+
+def test_get_price_data_downloads_only_gap(tmp_path, monkeypatch):
+    calls = []
+    monkeypatch.setattr(cache, "CACHE_DIR", tmp_path)
+    monkeypatch.setattr(providers.yf, "download", _fake_download(calls))
+    monkeypatch.setattr(cache, "_today", lambda: pd.Timestamp("2025-08-08"))
+
+    data = cache.get_price_data("AAA", period="2d", date="2025-08-07")
+    assert list(data["Close"]) == [6.0, 7.0]
+    assert len(calls) == 1
+
+    # Same day again is served from disk
+    cache.get_price_data("AAA", period="2d", date="2025-08-07")
+    assert len(calls) == 1
+
+    # The next day only downloads the missing bars
+    data = cache.get_price_data("AAA", period="2d", date="2025-08-08")
+    assert list(data["Close"]) == [7.0, 8.0]
+    assert len(calls) == 2
+    assert calls[-1][1] == "2025-08-07"
+    assert list(tmp_path.glob("*.pkl")) == [tmp_path / "AAA.pkl"]
+
+
+def test_failed_or_partial_download_is_not_marked_covered(tmp_path, monkeypatch):
+    calls = []
+    working = _fake_download(calls)
+    state = {"fail": True}
+
+    def download(ticker, start=None, end=None, **kwargs):
+        if state["fail"]:
+            calls.append((ticker, start, end))
+            return pd.DataFrame()
+        return working(ticker, start=start, end=end, **kwargs)
+
+    monkeypatch.setattr(cache, "CACHE_DIR", tmp_path)
+    monkeypatch.setattr(providers.yf, "download", download)
+    monkeypatch.setattr(cache, "_today", lambda: pd.Timestamp("2025-08-08"))
+
+    # yfinance reports a failure as an empty frame; nothing is stored
+    assert cache.get_price_data("AAA", period="1y").empty
+    assert not (tmp_path / "AAA.pkl").exists()
+
+    state["fail"] = False
+    assert len(cache.get_price_data("AAA", period="1y")) > 200
+    assert len(calls) == 2
+
+    # Before Monday's open only Friday's bar exists, so a later run fetches
+    # Monday again
+    def pre_open(ticker, start=None, end=None, **kwargs):
+        return working(ticker, start=start, end="2025-08-09", **kwargs)
+
+    monkeypatch.setattr(cache, "_today", lambda: pd.Timestamp("2025-08-11"))
+    monkeypatch.setattr(providers.yf, "download", pre_open)
+    assert cache.get_price_data("AAA", period="2d").index[-1] == pd.Timestamp("2025-08-08")
+    assert cache.load_cached("AAA")["end"] == pd.Timestamp("2025-08-08")
+
+    monkeypatch.setattr(providers.yf, "download", working)
+    assert cache.get_price_data("AAA", period="2d").index[-1] == pd.Timestamp("2025-08-11")
+
+
+def test_weekend_and_past_days_are_final(tmp_path, monkeypatch):
+    calls = []
+    monkeypatch.setattr(cache, "CACHE_DIR", tmp_path)
+    monkeypatch.setattr(providers.yf, "download", _fake_download(calls))
+
+    # Sunday: the last bar is Friday's, and no later one is coming
+    monkeypatch.setattr(cache, "_today", lambda: pd.Timestamp("2025-08-03"))
+    for _ in range(3):
+        assert cache.get_price_data("AAA", period="2d").index[-1] == pd.Timestamp("2025-08-01")
+    assert len(calls) == 1
+
+    # Bars stop before a past day that was asked for (a delisting or a
+    # holiday); the day is still covered
+    many = []
+
+    def download(tickers, start=None, end=None, **kwargs):
+        many.append(list(tickers))
+        single = _fake_download([])
+        return pd.concat({t: single(t, start=start, end=min(end, "2025-08-02")) for t in tickers}, axis=1)
+
+    monkeypatch.setattr(cache, "_today", lambda: pd.Timestamp("2025-08-10"))
+    monkeypatch.setattr(providers.yf, "download", download)
+    for _ in range(3):
+        cache.get_price_data_many(["ABC", "DEF"], period="2d", date="2025-08-04")
+    assert many == [["ABC", "DEF"]]
+
+
+def test_range_request_does_not_reuse_period_shape(tmp_path, monkeypatch):
+    calls = []
+    monkeypatch.setattr(cache, "CACHE_DIR", tmp_path)
+    monkeypatch.setattr(providers.yf, "download", _fake_download(calls))
+    monkeypatch.setattr(cache, "_today", lambda: pd.Timestamp("2025-08-08"))
+
+    cache.get_price_data("^RUT", period="2d", date="2025-08-08")
+    data = cache.get_price_data(
+        "^RUT", date="2025-08-08", start="2025-07-01", end="2025-08-09"
+    )
+    assert data.index[0] == pd.Timestamp("2025-07-01")
+    assert data.index[-1] == pd.Timestamp("2025-08-08")
+    assert len(data) == len(pd.bdate_range("2025-07-01", "2025-08-08"))
+
+
+def test_get_price_data_many_batches_misses(tmp_path, monkeypatch):
+    calls = []
+    single = _fake_download([])
+
+    def download(tickers, start=None, end=None, progress=False, group_by=None, **kwargs):
+        calls.append(list(tickers))
+        frames = {t: single(t, start=start, end=end) for t in tickers}
+        return pd.concat(frames, axis=1)
+
+    monkeypatch.setattr(cache, "CACHE_DIR", tmp_path)
+    monkeypatch.setattr(cache, "MEMORY_CACHE", cache.MemoryCache())
+    monkeypatch.setattr(providers.yf, "download", download)
+    monkeypatch.setattr(cache, "_today", lambda: pd.Timestamp("2025-08-08"))
+
+    result = cache.get_price_data_many(["AAA", "BBB", "AAA"], period="2d", date="2025-08-08")
+    assert calls == [["AAA", "BBB"]]
+    # A cold store counts one miss per ticker
+    assert (cache.cache_stats()["hits"], cache.cache_stats()["misses"]) == (0, 2)
+    assert set(result) == {"AAA", "BBB"}
+    assert list(result["BBB"]["Close"]) == [7.0, 8.0]
+
+    # Entries are split per ticker, so a single lookup is served from disk
+    assert list(cache.get_price_data("AAA", period="2d", date="2025-08-08")["Close"]) == [7.0, 8.0]
+    cache.get_price_data_many(["AAA", "BBB"], period="2d", date="2025-08-08")
+    assert len(calls) == 1
+    assert (cache.cache_stats()["hits"], cache.cache_stats()["misses"]) == (3, 2)
+
+
+def test_memory_cache_hits_and_mtime_invalidation(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache, "CACHE_DIR", tmp_path)
+    monkeypatch.setattr(cache, "MEMORY_CACHE", cache.MemoryCache(max_entries=2))
+    frame = pd.DataFrame({"Close": [1.0]}, index=pd.DatetimeIndex(["2025-08-08"], name="Date"))
+    entry = {"start": frame.index[0], "end": frame.index[0], "data": frame}
+
+    cache.save_cache("AAA", entry)
+    assert cache.load_cached("AAA") is entry
+    assert cache.cache_stats()["hits"] == 1
+
+    # A file rewritten behind the cache's back is loaded again
+    path = tmp_path / "AAA.pkl"
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    assert cache.load_cached("AAA") is not entry
+    assert cache.cache_stats()["misses"] == 1
+
+    # Entry count is bounded
+    cache.save_cache("BBB", entry)
+    cache.save_cache("CCC", entry)
+    assert cache.cache_stats()["entries"] == 2
+
+
+def test_concurrent_misses_share_one_download(tmp_path, monkeypatch):
+    calls = []
+    base = _fake_download(calls)
+
+    def slow_download(*args, **kwargs):
+        time.sleep(0.05)
+        return base(*args, **kwargs)
+
+    monkeypatch.setattr(cache, "CACHE_DIR", tmp_path)
+    monkeypatch.setattr(providers.yf, "download", slow_download)
+    monkeypatch.setattr(cache, "_today", lambda: pd.Timestamp("2025-08-08"))
+
+    results = []
+    threads = [
+        threading.Thread(
+            target=lambda: results.append(cache.get_price_data("AAA", period="2d", date="2025-08-08"))
+        )
+        for _ in range(5)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(calls) == 1
+    assert all(list(r["Close"]) == [7.0, 8.0] for r in results)
+    assert [p.name for p in tmp_path.iterdir()] == ["AAA.pkl"]
+
+
+def test_download_options_get_their_own_store(tmp_path, monkeypatch):
+    calls = []
+    monkeypatch.setattr(cache, "CACHE_DIR", tmp_path)
+    monkeypatch.setattr(providers.yf, "download", _fake_download(calls))
+    monkeypatch.setattr(cache, "_today", lambda: pd.Timestamp("2025-08-08"))
+
+    cache.get_price_data("AAA", start="2025-08-01", end="2025-08-09")
+    cache.get_price_data("AAA", start="2025-08-04", end="2025-08-06", progress=False)
+    assert len(calls) == 1
+
+    cache.get_price_data("AAA", start="2025-08-04", end="2025-08-06", auto_adjust=False)
+    assert len(calls) == 2
+    assert sorted(p.name for p in tmp_path.glob("*.pkl")) == [
+        "AAA.pkl",
+        "AAA@auto_adjust=False.pkl",
+    ]
@@ -43,6 +43,13 @@ def test_dashboard_routes(tmp_path, monkeypatch):
         assert client.get("/graph_image").status_code == 200
         assert client.get("/overview").status_code == 200
 
+    # The manifest names the current graph even when it is not the newest file
+    (graph_dir / "current.png").write_bytes(b"current")
+    (graph_dir / "latest.json").write_text('{"hash": "x", "file": "current.png"}')
+    (graph_dir / "newer.png").write_bytes(b"newer")
+    with app.test_client() as client:
+        assert client.get("/graph_image").data == b"current"
+
 
 def test_status_route(tmp_path, monkeypatch):
     csv_dir, graph_dir, audit_file = _setup_files(tmp_path)
@@ -190,3 +197,45 @@ def test_portfolio_edit(tmp_path, monkeypatch):
     assert len(backups) == 1
 
 
+
+
+def test_pnl_engine_uses_configured_method(tmp_path, monkeypatch):
+    from src.portfolio import pnl
+
+    csv_dir, graph_dir, audit_file = _setup_files(tmp_path)
+    cfg_file = tmp_path / "config.yaml"
+    cfg_file.write_text("pnl_method: fifo\n")
+    monkeypatch.setattr(app_module, "CSV_DIR", csv_dir)
+    monkeypatch.setattr(app_module, "CONFIG_FILE", cfg_file)
+    pnl.clear()
+
+    assert app_module._pnl_engine().method == "fifo"
+
+
+def test_failed_manual_sell_leaves_shared_ledger_alone(tmp_path, monkeypatch):
+    from src.portfolio import ledger
+
+    csv_dir, graph_dir, audit_file = _setup_files(tmp_path)
+    pf = csv_dir / "chatgpt_portfolio_update.csv"
+    pf.write_text(
+        "Date,Ticker,Shares,Cost Basis,Stop Loss,Current Price,Total Value,PnL,Action,Cash Balance,Total Equity\n"
+        "2025-08-10,AAA,10,2.0,1.0,3.0,30.0,10.0,HOLD,,\n"
+        "2025-08-10,TOTAL,,,,,30.0,10.0,,50.0,80.0\n"
+    )
+    monkeypatch.setattr(app_module, "CSV_DIR", csv_dir)
+    monkeypatch.setattr(app_module.audit, "LOG_FILE", audit_file)
+    monkeypatch.chdir(tmp_path)
+    ledger.clear()
+    book = ledger.get_ledger(pf)
+
+    def fail(self, portfolio, cash, prices=None):
+        raise RuntimeError("price fetch failed")
+
+    monkeypatch.setattr(app_module.Portfolio, "process", fail)
+    with app.test_client() as client:
+        resp = client.post("/manual_sell", data={"ticker": "AAA", "shares": "10", "price": "3"})
+    assert resp.status_code == 500
+
+    assert ledger.get_ledger(pf) is book
+    assert book.positions["AAA"].shares == 10
+    assert book.cash == 50.0
@@ -0,0 +1,41 @@
+import pathlib
+import sys
+
+import pandas as pd
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+
+from src import generate_graph as graph
+from src.price_context import PriceContext
+
+
+def test_update_graph_renders_only_when_series_change(tmp_path, monkeypatch):
+    csv_dir = tmp_path / "Scripts and CSV Files"
+    csv_dir.mkdir()
+    update_csv = csv_dir / "chatgpt_portfolio_update.csv"
+    update_csv.write_text("Date,Ticker,Total Equity\n2025-07-01,TOTAL,101\n")
+    monkeypatch.setattr(graph, "BASE_DIR", tmp_path)
+
+    rendered = []
+
+    def fake_render(totals, russell, xbi, save_path, show):
+        rendered.append(save_path)
+        pathlib.Path(save_path).write_bytes(b"png")
+
+    monkeypatch.setattr(graph, "_render", fake_render)
+    index = pd.bdate_range("2025-06-27", "2025-07-03", name="Date")
+    bars = pd.DataFrame({"Close": 100.0}, index=index)
+    prices = PriceContext("2025-07-03", {"^RUT": bars, "XBI": bars})
+    graphs = tmp_path / "graphs"
+
+    path, fresh = graph.update_graph(graphs, "performance_2025-07-01.png", prices)
+    assert fresh and path.name == "performance_2025-07-01.png"
+    path, fresh = graph.update_graph(graphs, "performance_2025-07-02.png", prices)
+    assert not fresh and path.name == "performance_2025-07-01.png"
+    assert graph.read_manifest(graphs)["file"] == "performance_2025-07-01.png"
+
+    with update_csv.open("a") as f:
+        f.write("2025-07-02,TOTAL,103\n")
+    path, fresh = graph.update_graph(graphs, "performance_2025-07-02.png", prices)
+    assert fresh and len(rendered) == 2
+    assert graph.read_manifest(graphs)["file"] == "performance_2025-07-02.png"
@@ -0,0 +1,50 @@
+import os
+import pathlib
+import subprocess
+import sys
+
+import pytest
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+
+# Seconds an entry point may spend importing, not counting pandas which
+# nearly every module needs.  Override on slow machines.
+BUDGET = float(os.getenv("IMPORT_TIME_BUDGET", "0.6"))
+
+# Dependencies that must only be loaded on first use
+LAZY = {
+    "src.trading": ["matplotlib", "yfinance"],
+    "dashboard.app": ["matplotlib", "yfinance", "daily_run", "schedule", "src.trading"],
+}
+
+
+def _import_times(module):
+    """Return ``{module: cumulative microseconds}`` from ``python -X importtime``."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    times = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if cumulative.strip().isdigit():
+            times[name.strip()] = int(cumulative)
+    return times
+
+
+@pytest.mark.parametrize("module", sorted(LAZY))
+def test_startup_imports_stay_light(module):
+    times = _import_times(module)
+    loaded = [name for name in LAZY[module] if name in times]
+    assert not loaded, f"{module} imports {loaded} at startup"
+
+    seconds = (times[module] - times.get("pandas", 0)) / 1e6
+    assert seconds < BUDGET, f"importing {module} took {seconds:.2f}s beyond pandas"
+
+
+def test_importing_cache_creates_no_directory(tmp_path):
+    env = dict(os.environ, PRICE_CACHE_DIR=str(tmp_path / "cache"))
+    subprocess.run([sys.executable, "-c", "import src.cache"], cwd=ROOT, env=env, check=True)
+    assert not (tmp_path / "cache").exists()
@@ -0,0 +1,72 @@
+import os
+import pathlib
+import sys
+import threading
+import time
+
+import pandas as pd
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+
+from src import cache, janitor
+
+
+def _entry(days):
+    index = pd.bdate_range("2025-01-01", periods=days, name="Date")
+    data = pd.DataFrame({"Close": range(days)}, index=index, dtype=float)
+    return {"start": index[0], "end": index[-1], "data": data}
+
+
+def test_prune_cache_enforces_limits(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache, "CACHE_DIR", tmp_path)
+    monkeypatch.setattr(janitor, "_trim_checked", {})
+
+    (tmp_path / "AAA_2025-08-01.pkl").write_bytes(b"x" * 10)
+    cache.save_cache("OLD", _entry(5))
+    old = tmp_path / "OLD.pkl"
+    stale = time.time() - 40 * 86400
+    os.utime(old, (stale, stale))
+    cache.save_cache("BBB", _entry(50))
+
+    report = janitor.prune_cache(max_age_days=30, keep_latest=10)
+
+    assert report["removed"] == 2
+    assert report["trimmed"] == 1
+    assert report["bytes_reclaimed"] > 0
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["BBB.pkl"]
+    entry = cache.load_cached("BBB")
+    assert len(entry["data"]) == 10
+    assert entry["start"] == entry["data"].index[0]
+
+
+def test_prune_cache_respects_byte_budget_and_limit(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache, "CACHE_DIR", tmp_path)
+    for i, ticker in enumerate(["AAA", "BBB", "CCC"]):
+        cache.save_cache(ticker, _entry(20))
+        os.utime(tmp_path / f"{ticker}.pkl", (1000 + i, 1000 + i))
+    size = (tmp_path / "AAA.pkl").stat().st_size
+
+    report = janitor.prune_cache(max_bytes=size, limit=1)
+    assert report["removed"] == 1
+    assert not (tmp_path / "AAA.pkl").exists()
+
+    janitor.prune_cache(max_bytes=size)
+    assert [p.name for p in tmp_path.iterdir()] == ["CCC.pkl"]
+
+
+def test_trim_waits_for_a_fill_in_progress(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache, "CACHE_DIR", tmp_path)
+    monkeypatch.setattr(janitor, "_trim_checked", {})
+    cache.save_cache("AAA", _entry(20))
+
+    with cache._filling(["AAA"]):
+        trim = threading.Thread(target=janitor.prune_cache, kwargs={"keep_latest": 10})
+        trim.start()
+        time.sleep(0.1)
+        # A fill finishing while the janitor waits adds a bar
+        cache.save_cache("AAA", _entry(21))
+    trim.join()
+
+    entry = cache.load_cached("AAA")
+    assert len(entry["data"]) == 10
+    assert entry["end"] == _entry(21)["end"]
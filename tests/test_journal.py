@@ -0,0 +1,45 @@
+import pathlib
+import sys
+
+import pandas as pd
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+
+from src.portfolio import journal
+
+
+def test_append_trades_keeps_fixed_schema(tmp_path):
+    path = str(tmp_path / "log.csv")
+    journal.append_trades([{"Date": "2025-08-01", "Ticker": "AAA", "Shares Sold": 2, "Sell Price": 3.0}], path)
+    journal.append_trades([{"Date": "2025-08-02", "Ticker": "BBB", "Shares Bought": 1, "Buy Price": 4.0}], path)
+
+    df = pd.read_csv(path)
+    assert list(df.columns) == journal.FIELDS
+    assert list(df["Ticker"]) == ["AAA", "BBB"]
+    assert df.iloc[0]["Shares Sold"] == 2
+    assert pd.isna(df.iloc[0]["Buy Price"])
+
+
+def test_append_trades_migrates_legacy_layout(tmp_path):
+    path = tmp_path / "log.csv"
+    path.write_text(
+        "Date,Ticker,Shares Sold,Sell Price,Cost Basis,PnL,Reason\n"
+        "2025-08-01,AAA,2,3.0,5.0,1.0,STOP\n"
+    )
+    journal.append_trades([{"Date": "2025-08-02", "Ticker": "BBB", "PnL": 0.0}], str(path))
+
+    df = pd.read_csv(path)
+    assert list(df.columns) == journal.FIELDS
+    assert df.iloc[0]["Sell Price"] == 3.0
+    assert df.iloc[1]["Ticker"] == "BBB"
+
+
+def test_read_trades_limit_returns_latest(tmp_path):
+    path = str(tmp_path / "log.csv")
+    journal.append_trades(
+        [{"Date": "2025-08-01", "Ticker": f"T{i}", "PnL": float(i)} for i in range(10)], path
+    )
+    df = journal.read_trades(path, limit=3)
+    assert list(df.columns) == journal.FIELDS
+    assert list(df["Ticker"]) == ["T7", "T8", "T9"]
+    assert len(journal.read_trades(path)) == 10
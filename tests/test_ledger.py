@@ -0,0 +1,80 @@
+import pathlib
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+
+from src.portfolio import ledger
+from src.portfolio.ledger import Ledger, Position
+
+
+COLUMNS = [
+    "Date", "Ticker", "Shares", "Cost Basis", "Stop Loss", "Current Price",
+    "Total Value", "PnL", "Action", "Cash Balance", "Total Equity",
+]
+
+
+def _write_history(path):
+    rows = [
+        ["2025-01-01", "AAA", 5, 1.0, 0.5, 1.1, 5.5, 0.5, "HOLD", "", ""],
+        ["2025-01-01", "TOTAL", "", "", "", "", 5.5, 0.5, "", 50.0, 55.5],
+        ["2025-01-02", "AAA", 5, 1.0, 0.5, 1.2, 6.0, 1.0, "HOLD", "", ""],
+        ["2025-01-02", "BBB", 2, 3.0, 2.5, 2.0, 4.0, -2.0, "SELL - Stop Loss Triggered", "", ""],
+        ["2025-01-02", "TOTAL", "", "", "", "", 6.0, 1.0, "", 54.0, 60.0],
+    ]
+    pd.DataFrame(rows, columns=COLUMNS).to_csv(path, index=False)
+
+
+def test_from_history_reads_latest_open_positions(tmp_path):
+    path = tmp_path / "update.csv"
+    _write_history(path)
+
+    book = Ledger.from_history(path)
+
+    assert book.date == "2025-01-02"
+    assert book.cash == pytest.approx(54.0)
+    assert list(book.positions) == ["AAA"]
+    assert book.positions["AAA"].buy_price == pytest.approx(1.0)
+    frame = book.to_frame()
+    assert frame.loc[0, "cost_basis"] == pytest.approx(5.0)
+
+
+def test_sell_on_a_copy_leaves_the_ledger_unchanged():
+    book = Ledger({"AAA": Position("AAA", 20, 3.0, 1.0)}, cash=60.0)
+    assert not hasattr(book.positions["AAA"], "__dict__")
+
+    pending = book.copy()
+    pnl = pending.sell("AAA", 20, 5.0)
+    assert pnl == pytest.approx(40.0)
+    assert "AAA" not in pending.positions
+    assert pending.cash == pytest.approx(160.0)
+    with pytest.raises(KeyError):
+        pending.sell("AAA", 1, 5.0)
+
+    assert book.positions["AAA"].shares == 20
+    assert book.cash == pytest.approx(60.0)
+
+
+def test_get_ledger_is_shared_until_the_csv_changes(tmp_path, monkeypatch):
+    ledger.clear()
+    path = tmp_path / "update.csv"
+    _write_history(path)
+
+    book = ledger.get_ledger(path)
+    assert ledger.get_ledger(path) is book
+
+    rows = pd.DataFrame(
+        [["2025-01-03", "TOTAL", "", "", "", "", 0.0, 0.0, "", 70.0, 70.0]],
+        columns=COLUMNS,
+    )
+    rows.to_csv(path, mode="a", header=False, index=False)
+    recorded = ledger.record_day(path, rows)
+    assert ledger.get_ledger(path) is recorded
+    assert recorded.cash == pytest.approx(70.0)
+
+    # A restarted process loads the snapshot instead of parsing the CSV
+    ledger.clear()
+    monkeypatch.setattr(Ledger, "from_history", classmethod(lambda cls, p: pytest.fail("CSV re-read")))
+    assert ledger.get_ledger(path).cash == pytest.approx(70.0)
@@ -5,7 +5,7 @@ import sys
 
 sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
 
-from src import portfolio as portfolio_module
+from src import cache, providers
 from src.portfolio import Portfolio
 import dashboard.audit as audit_module
 import json
@@ -15,7 +15,12 @@ def test_log_manual_buy_creates_entry(tmp_path, monkeypatch):
     portfolio_obj = Portfolio(today="2025-08-05")
 
     # Dummy data instead of real network call
-    monkeypatch.setattr(portfolio_module.yf, "download", lambda *a, **k: pd.DataFrame({"Close": [10.0]}))
+    monkeypatch.setattr(cache, "CACHE_DIR", tmp_path)
+    monkeypatch.setattr(
+        providers.yf,
+        "download",
+        lambda *a, **k: pd.DataFrame({"Close": [10.0]}, index=pd.DatetimeIndex(["2025-08-05"])),
+    )
     monkeypatch.setattr("builtins.input", lambda *a, **k: "0")
 
     work = tmp_path / "buy"
@@ -0,0 +1,67 @@
+import pathlib
+import sys
+
+import pytest
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+
+from src.portfolio import journal, pnl
+from src.portfolio.pnl import PnLEngine
+
+
+def _trades():
+    return [
+        {"Date": "2025-01-01", "Ticker": "AAA", "Shares Bought": 10, "Buy Price": 1.0},
+        {"Date": "2025-01-02", "Ticker": "AAA", "Shares Bought": 10, "Buy Price": 2.0},
+        {"Date": "2025-01-03", "Ticker": "AAA", "Shares Sold": 10, "Sell Price": 3.0, "PnL": 15.0},
+    ]
+
+
+@pytest.mark.parametrize("method, realized, unrealized", [
+    ("average", 15.0, 5.0),
+    ("fifo", 20.0, 0.0),
+])
+def test_engine_realized_and_unrealized(method, realized, unrealized):
+    engine = PnLEngine(method)
+    for trade in _trades():
+        engine.apply(trade)
+    engine.mark({"AAA": 2.0})
+
+    assert engine.realized == pytest.approx(realized)
+    assert engine.unrealized == pytest.approx(unrealized)
+    row = engine.frame().iloc[0]
+    assert row["shares"] == 10
+    assert row["realized"] == pytest.approx(realized)
+
+
+def test_sell_of_untracked_shares_uses_recorded_pnl():
+    engine = PnLEngine()
+    engine.apply({"Ticker": "OLD", "Shares Sold": 5, "Sell Price": 4.0, "PnL": 7.5})
+    assert engine.realized == pytest.approx(7.5)
+    assert engine.frame().iloc[0]["shares"] == 0
+
+
+def test_get_engine_resumes_from_checkpoint(tmp_path, monkeypatch):
+    pnl.clear()
+    log = tmp_path / "trade_log.csv"
+    journal.append_trades(_trades()[:2], log)
+
+    engine = pnl.get_engine(log, "fifo")
+    assert engine.tickers["AAA"].shares == 20
+    assert pnl.checkpoint_path(log).exists()
+
+    # A new process picks up the checkpoint and only applies the new trade
+    pnl.clear()
+    journal.append_trades(_trades()[2:], log)
+    applied = []
+    original = PnLEngine.apply
+    monkeypatch.setattr(PnLEngine, "apply", lambda self, r: (applied.append(r), original(self, r)))
+    engine = pnl.get_engine(log)
+    assert engine.method == "fifo"
+    assert len(applied) == 1
+    assert engine.realized == pytest.approx(20.0)
+
+    # A rewritten journal is replayed from the start
+    log.write_text("Date,Ticker,Shares Bought,Buy Price\n2025-01-01,BBB,1,1.0\n")
+    engine = pnl.get_engine(log)
+    assert list(engine.tickers) == ["BBB"]
@@ -0,0 +1,60 @@
+import pathlib
+import sys
+
+import pandas as pd
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+
+from src.portfolio import csvtail, history
+
+
+def _rows(date, tickers, value=1.0):
+    return pd.DataFrame({
+        "Date": date,
+        "Ticker": tickers,
+        "Total Value": value,
+    })
+
+
+def test_write_day_appends_and_replaces_tail(tmp_path):
+    path = str(tmp_path / "update.csv")
+    history.write_day(path, "2025-08-01", _rows("2025-08-01", ["AAA", "TOTAL"]))
+    history.write_day(path, "2025-08-04", _rows("2025-08-04", ["AAA", "BBB", "TOTAL"]))
+    first_day = open(path).read().splitlines()[:3]
+
+    # Rerunning the latest day only replaces its rows
+    history.write_day(path, "2025-08-04", _rows("2025-08-04", ["BBB", "TOTAL"], 2.0))
+    lines = open(path).read().splitlines()
+    assert lines[:3] == first_day
+    df = pd.read_csv(path)
+    assert list(df["Date"]) == ["2025-08-01"] * 2 + ["2025-08-04"] * 2
+    assert list(df["Ticker"].iloc[-2:]) == ["BBB", "TOTAL"]
+    assert list(df["Total Value"].iloc[-2:]) == [2.0, 2.0]
+
+
+def test_write_day_rewrites_for_older_day_or_new_columns(tmp_path):
+    path = str(tmp_path / "update.csv")
+    history.write_day(path, "2025-08-01", _rows("2025-08-01", ["AAA"]))
+    history.write_day(path, "2025-08-04", _rows("2025-08-04", ["BBB"]))
+
+    history.write_day(path, "2025-08-01", _rows("2025-08-01", ["CCC"]))
+    df = pd.read_csv(path)
+    assert sorted(df["Ticker"]) == ["BBB", "CCC"]
+
+    extra = _rows("2025-08-05", ["DDD"]).assign(Note="x")
+    history.write_day(path, "2025-08-05", extra)
+    df = pd.read_csv(path)
+    assert list(df.columns) == ["Date", "Ticker", "Total Value", "Note"]
+    assert len(df) == 3
+
+
+def test_write_day_handles_large_tail(tmp_path, monkeypatch):
+    monkeypatch.setattr(csvtail, "_CHUNK", 16)
+    path = str(tmp_path / "update.csv")
+    tickers = [f"T{i}" for i in range(50)]
+    history.write_day(path, "2025-08-01", _rows("2025-08-01", tickers))
+    history.write_day(path, "2025-08-04", _rows("2025-08-04", tickers))
+    history.write_day(path, "2025-08-04", _rows("2025-08-04", tickers[:3]))
+    df = pd.read_csv(path)
+    assert (df["Date"] == "2025-08-01").sum() == 50
+    assert list(df[df["Date"] == "2025-08-04"]["Ticker"]) == tickers[:3]
@@ -0,0 +1,97 @@
+import pathlib
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+
+from src import cache, providers, trading
+from src.portfolio import Portfolio
+from src.price_context import PriceContext
+
+
+def test_one_fetch_serves_every_stage(tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr(cache, "CACHE_DIR", tmp_path / "cache")
+    (tmp_path / "cache").mkdir()
+    monkeypatch.setattr(cache, "_today", lambda: pd.Timestamp("2025-08-01"))
+    calls = []
+
+    def download(tickers, start=None, end=None, **kwargs):
+        calls.append(list(tickers))
+        index = pd.bdate_range(start, pd.Timestamp(end) - pd.Timedelta(days=1), name="Date")
+        frames = {t: pd.DataFrame({"Close": 10.0, "Volume": 1.0}, index=index) for t in tickers}
+        return pd.concat(frames, axis=1)
+
+    monkeypatch.setattr(providers.yf, "download", download)
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "Scripts and CSV Files").mkdir()
+
+    prices = PriceContext.build(["AAA", "^RUT", "XBI"], today="2025-08-01")
+    assert calls == [["AAA"], ["^RUT", "XBI"]]
+    assert len(prices.bars("AAA", 2)) == 2
+    assert prices.range("^RUT", "2025-06-27", "2025-07-01").index[-1] == pd.Timestamp("2025-06-30")
+
+    portfolio = pd.DataFrame([{"ticker": "AAA", "shares": 1, "stop_loss": 5.0, "buy_price": 8.0}])
+    obj = Portfolio(today="2025-08-01")
+    monkeypatch.setattr(obj, "log_sells", lambda sales: None)
+    obj.process(portfolio, 10.0, prices)
+    trading.daily_results(portfolio, ["^RUT", "XBI"], "2025-08-01", prices)
+
+    assert len(calls) == 2
+    assert "Latest ChatGPT Equity: $20.00" in capsys.readouterr().out
+
+
+def test_daily_results_skips_unpriced_tickers(tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "Scripts and CSV Files").mkdir()
+    pd.DataFrame({
+        "Date": ["2025-08-01"] * 2,
+        "Ticker": ["AAA", "TOTAL"],
+        "Action": ["HOLD - No Price", ""],
+        "Total Equity": ["", 10.0],
+    }).to_csv("Scripts and CSV Files/chatgpt_portfolio_update.csv", index=False)
+    index = pd.bdate_range("2025-06-27", "2025-08-01", name="Date")
+    bars = pd.DataFrame({"Close": 10.0, "Volume": 1.0}, index=index)
+    empty = pd.DataFrame(index=pd.DatetimeIndex([], name="Date"))
+    prices = PriceContext("2025-08-01", {"AAA": empty, "^RUT": bars})
+
+    portfolio = pd.DataFrame([{"ticker": "AAA", "shares": 1, "stop_loss": 5.0, "buy_price": 8.0}])
+    trading.daily_results(portfolio, ["^RUT"], "2025-08-01", prices)
+
+    out = capsys.readouterr().out
+    assert "AAA: no price data, skipping" in out
+    assert "^RUT closing price: 10.00" in out
+    assert "Latest ChatGPT Equity: $10.00" in out
+
+
+def test_held_tickers_use_the_portfolio_fetch_limits(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache, "CACHE_DIR", tmp_path / "cache")
+    monkeypatch.setattr(cache, "_today", lambda: pd.Timestamp("2025-08-01"))
+    calls = []
+    down = {"BBB"}
+
+    def download(tickers, start=None, end=None, timeout=None, **kwargs):
+        calls.append((list(tickers), timeout))
+        index = pd.bdate_range(start, pd.Timestamp(end) - pd.Timedelta(days=1), name="Date")
+        frames = {t: pd.DataFrame({"Close": 10.0}, index=index) for t in tickers if t not in down}
+        return pd.concat(frames, axis=1) if frames else pd.DataFrame()
+
+    monkeypatch.setattr(providers.yf, "download", download)
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "Scripts and CSV Files").mkdir()
+
+    obj = Portfolio(today="2025-08-01", timeout=5.0, retries=0, batch_size=2)
+    monkeypatch.setattr(obj, "log_sells", lambda sales: None)
+    prices = PriceContext.build(["AAA", "BBB"], today="2025-08-01", benchmarks=(), portfolio=obj)
+    assert calls == [(["AAA", "BBB"], 5.0), (["BBB"], 5.0)]
+    assert "AAA" in prices and "BBB" not in prices
+
+    # A ticker the context could not price is fetched again by ``process``
+    down.clear()
+    portfolio = pd.DataFrame([
+        {"ticker": t, "shares": 1, "stop_loss": 5.0, "buy_price": 8.0} for t in ["AAA", "BBB"]
+    ])
+    df = pd.read_csv(obj.process(portfolio, 10.0, prices))
+    assert calls[-1] == (["BBB"], 5.0)
+    assert list(df["Action"].iloc[:2]) == ["HOLD", "HOLD"]
@@ -0,0 +1,52 @@
+import pathlib
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+
+from src import cache, price_matrix
+from src.price_matrix import PriceMatrix
+
+
+def _store(ticker, dates, closes):
+    index = pd.DatetimeIndex(dates, name="Date")
+    data = pd.DataFrame({"Close": closes}, index=index)
+    cache.save_cache(ticker, {"start": index[0], "end": index[-1], "data": data})
+
+
+def test_build_and_update_in_place(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache, "CACHE_DIR", tmp_path)
+    _store("AAA", ["2025-08-04", "2025-08-05"], [1.0, 2.0])
+    _store("BBB", ["2025-08-05"], [5.0])
+
+    matrix = PriceMatrix.build(["AAA", "BBB"])
+    assert matrix.values.shape == (2, 2)
+    assert np.isnan(matrix.row("BBB")[0])
+    data_file = tmp_path / "matrix" / price_matrix.DATA_FILE
+    inode = data_file.stat().st_ino
+
+    # A new trading day and a new ticker are appended without a rebuild
+    _store("AAA", ["2025-08-04", "2025-08-05", "2025-08-06"], [1.0, 2.0, 3.0])
+    _store("CCC", ["2025-08-06"], [9.0])
+    price_matrix.refresh(["AAA", "CCC"])
+    assert data_file.stat().st_ino == inode
+
+    reader = PriceMatrix.open()
+    assert reader.tickers == ["AAA", "BBB", "CCC"]
+    assert list(reader.row("AAA")) == [1.0, 2.0, 3.0]
+    assert reader.frame(["CCC"])["CCC"].iloc[-1] == pytest.approx(9.0)
+    with pytest.raises(ValueError):
+        reader.values[0, 0] = 0.0
+
+
+def test_update_with_earlier_day_rebuilds(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache, "CACHE_DIR", tmp_path)
+    _store("AAA", ["2025-08-05"], [2.0])
+    matrix = PriceMatrix.build(["AAA"])
+
+    matrix.update("AAA", pd.Series([1.0], index=pd.DatetimeIndex(["2025-08-04"])))
+    assert matrix.dates == [pd.Timestamp("2025-08-04"), pd.Timestamp("2025-08-05")]
+    assert list(PriceMatrix.open().row("AAA")) == [1.0, 2.0]
@@ -0,0 +1,55 @@
+import pathlib
+import sys
+import time
+
+import pandas as pd
+import pytest
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+
+from src import cache, providers
+from src.providers import PriceProvider, ReplayProvider
+
+
+class _Source(PriceProvider):
+    def download(self, tickers, start=None, end=None, **kwargs):
+        index = pd.bdate_range(start, pd.Timestamp(end) - pd.Timedelta(days=1), name="Date")
+        return pd.DataFrame({"Close": [float(d.day) for d in index], "Volume": 1.0}, index=index)
+
+
+def test_record_and_replay_through_cache(tmp_path, monkeypatch):
+    providers.record(["AAA", "BBB"], tmp_path / "rec", start="2025-08-01", end="2025-08-09", source=_Source())
+    replay = ReplayProvider(tmp_path / "rec", latency=0.01)
+    monkeypatch.setattr(providers, "_provider", replay)
+    monkeypatch.setattr(cache, "CACHE_DIR", tmp_path / "cache")
+    (tmp_path / "cache").mkdir()
+    monkeypatch.setattr(cache, "_today", lambda: pd.Timestamp("2025-08-08"))
+
+    data = cache.get_price_data_many(["AAA", "BBB"], period="2d", date="2025-08-08")
+    assert list(data["BBB"]["Close"]) == [7.0, 8.0]
+
+    assert replay.download("AAA", period="1d")["Close"].iloc[-1] == pytest.approx(8.0)
+    started = time.monotonic()
+    replay.download("AAA", period="1d")
+    assert time.monotonic() - started >= 0.01
+
+    assert replay.quotes(["AAA", "BBB", "MISSING"]) == {"AAA": 8.0, "BBB": 8.0}
+
+
+def test_provider_selected_from_environment(tmp_path, monkeypatch):
+    monkeypatch.setattr(providers, "_provider", None)
+    monkeypatch.setenv("PRICE_PROVIDER", "replay")
+    monkeypatch.setenv("PRICE_REPLAY_DIR", str(tmp_path))
+    monkeypatch.setenv("PRICE_REPLAY_LATENCY", "0.5")
+    provider = providers.get_provider()
+    assert isinstance(provider, ReplayProvider)
+    assert provider.latency == 0.5
+    assert provider.download("MISSING", period="1d").empty
+
+
+def test_provider_requires_download():
+    class _NoDownload(PriceProvider):
+        pass
+
+    with pytest.raises(TypeError):
+        _NoDownload()
@@ -0,0 +1,50 @@
+import os
+import pathlib
+import sys
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+
+from src import settings
+from dashboard import auth
+
+
+def test_config_reparsed_only_when_file_changes(tmp_path, monkeypatch):
+    cfg_file = tmp_path / "config.yaml"
+    cfg_file.write_text("watch_interval: 30\nextra_tickers:\n  - XBI\nemail: ''\n")
+    calls = []
+    parse = settings._parse_config
+    monkeypatch.setattr(settings, "_parse_config", lambda path: calls.append(path) or parse(path))
+    settings.clear()
+
+    config = settings.config(cfg_file)
+    assert config.get_float("watch_interval") == 30.0
+    assert config.get_list("extra_tickers") == ["XBI"]
+    assert config.get_str("email") == ""
+    assert config.get_int("cache_max_bytes") is None
+    assert settings.config(str(cfg_file)) is config
+    assert len(calls) == 1
+
+    cfg_file.write_text("watch_interval: 5\n")
+    os.utime(cfg_file, ns=(0, 10**9))
+    assert config.get_float("watch_interval") == 5.0
+    assert len(calls) == 2
+
+    cfg_file.unlink()
+    assert config.data == {}
+
+
+def test_credentials_cached_between_requests(tmp_path, monkeypatch):
+    env_file = tmp_path / ".env"
+    env_file.write_text("DASHBOARD_USERNAME=admin\nDASHBOARD_PASSWORD=secret\n")
+    monkeypatch.setattr(auth, "ENV_FILE", env_file)
+    calls = []
+    parse = settings._parse_env
+    monkeypatch.setattr(settings, "_parse_env", lambda path: calls.append(path) or parse(path))
+    settings.clear()
+
+    assert auth._load_credentials() == ("admin", "secret")
+    assert auth._load_credentials() == ("admin", "secret")
+    assert len(calls) == 1
+
+    env_file.write_text("DASHBOARD_USERNAME=root\nDASHBOARD_PASSWORD=secret\n")
+    assert auth._load_credentials() == ("root", "secret")
@@ -0,0 +1,51 @@
+import pathlib
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+
+from src import backtest, cache, sweep
+from src.price_matrix import PriceMatrix
+
+
+def test_grid_expands_overrides():
+    configs = sweep.grid([0.05, 0.1], {"AAA": [0.02, 0.2]})
+    assert len(configs) == 4
+    assert configs[1] == {"stop_loss": 0.05, "overrides": {"AAA": 0.2}}
+
+
+def test_sweep_ranks_configs_like_the_backtest(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache, "CACHE_DIR", tmp_path)
+    rng = np.random.default_rng(1)
+    index = pd.bdate_range("2025-07-01", periods=40, name="Date")
+    closes = pd.DataFrame(10 + np.cumsum(rng.normal(0, 0.3, size=(40, 3)), axis=0),
+                          index=index, columns=["AAA", "BBB", "CCC"])
+    for ticker in closes:
+        data = closes[[ticker]].rename(columns={ticker: "Close"})
+        cache.save_cache(ticker, {"start": index[0], "end": index[-1], "data": data})
+    PriceMatrix.build(closes.columns)
+
+    portfolio = pd.DataFrame({
+        "ticker": ["AAA", "BBB", "CCC"],
+        "shares": [4, 6, 2],
+        "buy_price": [10.0, 10.0, 10.0],
+        "stop_loss": [0.0, 0.0, 0.0],
+    })
+    configs = sweep.grid([0.02, 0.05, 0.1, 0.5], {"BBB": [0.01, 0.3]})
+    table = sweep.sweep(portfolio, 25.0, "2025-07-01", "2025-08-25", configs,
+                        directory=tmp_path / "matrix", workers=2, chunk_size=3)
+
+    assert len(table) == len(configs)
+    assert list(table.index) == list(range(1, len(configs) + 1))
+    assert table["final_equity"].is_monotonic_decreasing
+
+    best = table.iloc[0]
+    overrides = dict(item.split("=") for item in best["overrides"].split(","))
+    levels = [float(overrides.get(t, best["stop_loss"])) for t in portfolio["ticker"]]
+    stops = portfolio.assign(stop_loss=(portfolio["buy_price"] * (1 - np.array(levels))).round(2))
+    daily, trades = backtest.backtest(stops, 25.0, "2025-07-01", "2025-08-25", closes=closes)
+    assert best["final_equity"] == daily["Total Equity"].iloc[-1]
+    assert best["sells"] == len(trades)
+    assert (table["max_drawdown"] >= 0).all()
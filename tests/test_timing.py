@@ -0,0 +1,52 @@
+import json
+import pathlib
+import sys
+
+import pandas as pd
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+
+from src import timing, trading
+from src.portfolio import Portfolio
+
+
+def test_append_history_keeps_latest_runs(tmp_path):
+    path = tmp_path / "history.jsonl"
+    for i in range(5):
+        timing.append_history({"run": i}, path, limit=3)
+    assert [r["run"] for r in timing.read_history(path)] == [2, 3, 4]
+
+
+def test_run_records_stage_timings(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    config = tmp_path / "config.yaml"
+    config.write_text("default_cash: 100.0\nextra_tickers: [XBI]\n")
+    portfolio_csv = tmp_path / "pf.csv"
+    pd.DataFrame({"ticker": ["AAA"], "shares": [1], "stop_loss": [0.5], "buy_price": [1.0]}).to_csv(
+        portfolio_csv, index=False
+    )
+
+    def fake_process(self, portfolio, cash, prices=None):
+        self.rows_written = len(portfolio) + 1
+
+    monkeypatch.setattr(Portfolio, "process", fake_process)
+    monkeypatch.setattr(trading.PriceContext, "build", classmethod(lambda cls, tickers, **kw: cls("2025-08-01", {})))
+    monkeypatch.setattr(trading, "daily_results", lambda *a: None)
+    monkeypatch.setattr(trading.price_matrix, "refresh", lambda tickers: None)
+    monkeypatch.setattr(trading, "update_graph", lambda *a: (tmp_path / "graph.png", False))
+    status_file = tmp_path / "bot_status.json"
+    write_status = trading._write_status
+    monkeypatch.setattr(trading, "_write_status", lambda action, **kw: write_status(action, status_file, **kw))
+    history = tmp_path / "history.jsonl"
+    monkeypatch.setattr(trading, "append_history", lambda report: timing.append_history(report, history))
+
+    report = trading.run(portfolio_csv.as_posix(), None, config.as_posix(), today="2025-08-01")
+
+    assert set(report["stages"]) == {"load", "fetch", "process", "daily_results", "price_matrix", "graph"}
+    assert report["counters"]["positions"] == 1
+    assert report["counters"]["tickers"] == 2
+    assert report["counters"]["rows_written"] == 2
+    assert report["counters"]["graphs_rendered"] == 0
+    status = json.loads(status_file.read_text())
+    assert status["timing"]["stages"] == report["stages"]
+    assert timing.read_history(history) == [report]
@@ -1,3 +1,6 @@
+import asyncio
+import time
+
 import pandas as pd
 import pytest
 import pathlib
@@ -5,24 +8,36 @@ import sys
 
 sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
 
+from src import cache, providers
 from src import portfolio as portfolio_module
 from src.portfolio import Portfolio
 
-def test_process_portfolio_total_equity(tmp_path, monkeypatch):
-    portfolio_obj = Portfolio(today="2025-08-01")
 
-    # Fake yfinance history data
-    prices = {"AAA": 6.0, "BBB": 3.0}
+def _patch_prices(monkeypatch, tmp_path, prices, calls=None):
+    """Serve ``prices`` (ticker -> close, ``None`` for no data) through the cache."""
+    monkeypatch.setattr(cache, "CACHE_DIR", tmp_path / "cache")
+    (tmp_path / "cache").mkdir()
+
+    def download(tickers, start=None, end=None, **kwargs):
+        if calls is not None:
+            calls.append(list(tickers))
+        index = pd.DatetimeIndex([pd.Timestamp(end) - pd.Timedelta(days=1)], name="Date")
+        frames = {
+            t: pd.DataFrame({"Close": [prices[t]]}, index=index)
+            for t in tickers
+            if prices[t] is not None
+        }
+        return pd.concat(frames, axis=1) if frames else pd.DataFrame()
 
-    class DummyTicker:
-        def __init__(self, ticker):
-            self.ticker = ticker
-        def history(self, period="1d"):
-            return pd.DataFrame({"Close": [prices[self.ticker]]})
+    monkeypatch.setattr(providers.yf, "download", download)
 
-    monkeypatch.setattr(portfolio_module.yf, "Ticker", DummyTicker)
+def test_process_portfolio_total_equity(tmp_path, monkeypatch):
+    portfolio_obj = Portfolio(today="2025-08-01")
+
+    # Fake yfinance price data
+    _patch_prices(monkeypatch, tmp_path, {"AAA": 6.0, "BBB": 3.0})
     # Avoid writing trade logs
-    monkeypatch.setattr(portfolio_obj, "log_sell", lambda *a, **k: None)
+    monkeypatch.setattr(portfolio_obj, "log_sells", lambda sales: None)
 
     # Prepare working directory
     work = tmp_path / "run"
@@ -63,18 +78,10 @@ def test_log_sell_appends(tmp_path, monkeypatch):
 
 
 def test_process_portfolio_skips_empty(tmp_path, monkeypatch, capsys):
-    portfolio_obj = Portfolio(today="2025-08-03")
-
-    class DummyTicker:
-        def __init__(self, ticker):
-            self.ticker = ticker
-        def history(self, period="1d"):
-            if self.ticker == "AAA":
-                return pd.DataFrame()
-            return pd.DataFrame({"Close": [3.0]})
+    portfolio_obj = Portfolio(today="2025-08-03", retries=0)
 
-    monkeypatch.setattr(portfolio_module.yf, "Ticker", DummyTicker)
-    monkeypatch.setattr(portfolio_obj, "log_sell", lambda *a, **k: None)
+    _patch_prices(monkeypatch, tmp_path, {"AAA": None, "BBB": 3.0})
+    monkeypatch.setattr(portfolio_obj, "log_sells", lambda sales: None)
 
     work = tmp_path / "skip"
     work.mkdir()
@@ -90,43 +97,178 @@ def test_process_portfolio_skips_empty(tmp_path, monkeypatch, capsys):
     out = capsys.readouterr().out
 
     df = pd.read_csv(result_path)
-    assert "AAA" not in df["Ticker"].values
+    # The unpriced position is kept but left out of the totals
+    row = df[df["Ticker"] == "AAA"].iloc[-1]
+    assert row["Action"] == "HOLD - No Price"
+    assert pd.isna(row["Current Price"])
     total_row = df[df["Ticker"] == "TOTAL"].iloc[-1]
     assert total_row["Total Equity"] == pytest.approx(115.0)
     assert "Warning: no price history for AAA" in out
 
 
-def test_asyncio_gather_called(tmp_path, monkeypatch):
+def test_process_fetches_prices_in_one_cached_batch(tmp_path, monkeypatch):
     portfolio_obj = Portfolio(today="2025-08-04")
+    calls = []
+    _patch_prices(monkeypatch, tmp_path, {"AAA": 1.0, "BBB": 1.0}, calls)
+    monkeypatch.setattr(portfolio_obj, "log_sells", lambda sales: None)
 
-    class DummyTicker:
-        def __init__(self, ticker):
-            self.ticker = ticker
-        def history(self, period="1d"):
-            return pd.DataFrame({"Close": [1.0]})
+    work = tmp_path / "batch"
+    work.mkdir()
+    (work / "Scripts and CSV Files").mkdir()
+    monkeypatch.chdir(work)
 
-    monkeypatch.setattr(portfolio_module.yf, "Ticker", DummyTicker)
-    monkeypatch.setattr(portfolio_obj, "log_sell", lambda *a, **k: None)
+    portfolio = pd.DataFrame([
+        {"ticker": "AAA", "shares": 1, "stop_loss": 0.0, "buy_price": 1.0},
+        {"ticker": "BBB", "shares": 1, "stop_loss": 0.0, "buy_price": 1.0},
+    ])
 
-    called = False
-    orig_gather = portfolio_module.asyncio.gather
+    portfolio_obj.process(portfolio, 0.0)
+    assert calls == [["AAA", "BBB"]]
+
+    # A rerun on the same day is served from the cache
+    portfolio_obj.process(portfolio, 0.0)
+    assert len(calls) == 1
 
-    async def fake_gather(*tasks, **kwargs):
-        nonlocal called
-        called = True
-        return await orig_gather(*tasks, **kwargs)
 
-    monkeypatch.setattr(portfolio_module.asyncio, "gather", fake_gather)
+def test_process_portfolio_stop_loss_sells(tmp_path, monkeypatch):
+    portfolio_obj = Portfolio(today="2025-08-05")
+    _patch_prices(monkeypatch, tmp_path, {"AAA": 4.0, "BBB": 3.0})
+    batches = []
+    monkeypatch.setattr(portfolio_obj, "log_sells", lambda sales: batches.append(sales))
 
-    work = tmp_path / "async"
+    work = tmp_path / "stop"
     work.mkdir()
     (work / "Scripts and CSV Files").mkdir()
     monkeypatch.chdir(work)
 
     portfolio = pd.DataFrame([
-        {"ticker": "AAA", "shares": 1, "stop_loss": 0.0, "buy_price": 1.0},
-        {"ticker": "BBB", "shares": 1, "stop_loss": 0.0, "buy_price": 1.0},
+        {"ticker": "AAA", "shares": 10, "stop_loss": 4.5, "buy_price": 5.0},
+        {"ticker": "BBB", "shares": 5, "stop_loss": 2.0, "buy_price": 2.5},
     ])
 
-    portfolio_obj.process(portfolio, 0.0)
-    assert called
+    df = pd.read_csv(portfolio_obj.process(portfolio, 100.0))
+    assert batches == [[("AAA", 10, 4.0, 5.0, -10.0, "SELL - Stop Loss Triggered")]]
+    assert list(df["Action"].iloc[:2]) == ["SELL - Stop Loss Triggered", "HOLD"]
+    total_row = df[df["Ticker"] == "TOTAL"].iloc[-1]
+    assert total_row["Cash Balance"] == pytest.approx(140.0)
+    assert total_row["Total Value"] == pytest.approx(15.0)
+    assert total_row["PnL"] == pytest.approx(2.5)
+
+
+def test_process_async_reports_hung_ticker(tmp_path, monkeypatch, capsys):
+    from src.portfolio import ledger
+
+    calls = []
+
+    def download(tickers, start=None, end=None, timeout=None, **kwargs):
+        # Like yfinance, a ticker that times out is left out of the result
+        # instead of raising
+        calls.append((list(tickers), timeout))
+        if "SLOW" in tickers:
+            time.sleep(timeout)
+        index = pd.DatetimeIndex([pd.Timestamp(end) - pd.Timedelta(days=1)], name="Date")
+        frames = {t: pd.DataFrame({"Close": [2.0]}, index=index) for t in tickers if t != "SLOW"}
+        return pd.concat(frames, axis=1) if frames else pd.DataFrame()
+
+    monkeypatch.setattr(cache, "CACHE_DIR", tmp_path / "cache")
+    monkeypatch.setattr(providers.yf, "download", download)
+    portfolio_obj = Portfolio(today="2025-08-06", timeout=0.1, retries=1, batch_size=3)
+    monkeypatch.setattr(portfolio_obj, "log_sells", lambda sales: None)
+
+    work = tmp_path / "hung"
+    work.mkdir()
+    (work / "Scripts and CSV Files").mkdir()
+    monkeypatch.chdir(work)
+
+    portfolio = pd.DataFrame([
+        {"ticker": t, "shares": 1, "stop_loss": 0.0, "buy_price": 1.0}
+        for t in ["AAA", "BBB", "SLOW"]
+    ])
+
+    async def run_inside_loop():
+        return await portfolio_obj.process_async(portfolio, 10.0)
+
+    started = time.monotonic()
+    result_path = asyncio.run(run_inside_loop())
+    assert time.monotonic() - started < 2
+    # SLOW is retried within its batch and then on its own
+    assert calls == [(["AAA", "BBB", "SLOW"], 0.1), (["SLOW"], 0.1), (["SLOW"], 0.1)]
+
+    out = capsys.readouterr().out
+    assert "could not fetch prices for SLOW" in out
+    df = pd.read_csv(result_path)
+    rows = df.set_index("Ticker")
+    assert list(rows.loc[["AAA", "BBB"], "Current Price"]) == [2.0, 2.0]
+    assert rows.loc["SLOW", "Action"] == "HOLD - No Price"
+    assert rows.loc["TOTAL", "Total Equity"] == pytest.approx(14.0)
+    # and the unpriced position is still held
+    assert sorted(ledger.get_ledger(result_path).positions) == ["AAA", "BBB", "SLOW"]
+
+
+def test_log_sells_commits_batch_once(tmp_path, monkeypatch):
+    import dashboard.audit as audit_module
+
+    portfolio_obj = Portfolio(today="2025-08-07")
+    work = tmp_path / "batch_sell"
+    work.mkdir()
+    (work / "Scripts and CSV Files").mkdir()
+    monkeypatch.chdir(work)
+    audit_file = work / "audit.log"
+    monkeypatch.setattr(audit_module, "LOG_FILE", audit_file)
+    notes = []
+    monkeypatch.setattr(portfolio_module, "send_notification", lambda msg, **k: notes.append(msg))
+
+    portfolio_obj.log_sells([
+        ("AAA", 1, 4.0, 5.0, -1.0, "SELL - Stop Loss Triggered"),
+        ("BBB", 2, 1.0, 2.0, -2.0, "SELL - Stop Loss Triggered"),
+        ("CCC", 3, 2.0, 3.0, -3.0, "SELL - Stop Loss Triggered"),
+    ])
+
+    df = pd.read_csv("Scripts and CSV Files/chatgpt_trade_log.csv")
+    assert list(df["Ticker"]) == ["AAA", "BBB", "CCC"]
+    assert len(notes) == 1
+    assert notes[0].count("Sold") == 3
+    assert len(audit_file.read_text().splitlines()) == 1
+
+
+def test_run_many_fetches_shared_tickers_once(tmp_path, monkeypatch):
+    from src import trading
+
+    calls = []
+    _patch_prices(monkeypatch, tmp_path, {"AAA": 6.0, "BBB": 3.0, "CCC": 1.0}, calls)
+    fetch_log = tmp_path / "fetches.txt"
+    download = providers.yf.download
+
+    def logged_download(tickers, **kwargs):
+        with fetch_log.open("a") as f:
+            f.write(",".join(tickers) + "\n")
+        return download(tickers, **kwargs)
+
+    monkeypatch.setattr(providers.yf, "download", logged_download)
+    monkeypatch.setattr(trading.price_matrix, "refresh", lambda tickers: None)
+    monkeypatch.setattr(trading, "_write_status", lambda action, **kwargs: None)
+    monkeypatch.setattr(trading, "append_history", lambda report: None)
+    monkeypatch.chdir(tmp_path)
+
+    config = tmp_path / "config.yaml"
+    config.write_text("default_cash: 100.0\nextra_tickers: []\n")
+    paths = []
+    for name, tickers in {"model_a": ["AAA", "BBB"], "model_b": ["BBB", "CCC"]}.items():
+        path = tmp_path / f"{name}.csv"
+        pd.DataFrame({
+            "ticker": tickers, "shares": [1, 1], "stop_loss": [0.5, 0.5], "buy_price": [1.0, 1.0],
+        }).to_csv(path, index=False)
+        paths.append(path.as_posix())
+
+    report = trading.run_many(paths, config.as_posix(), out_dir="out", today="2025-08-01", workers=2)
+
+    # One batched download in the parent; workers are served from the cache
+    assert fetch_log.read_text().splitlines() == ["AAA,BBB,CCC"]
+    assert [row["portfolio"] for row in report["portfolios"]] == ["model_a", "model_b"]
+    assert report["counters"]["cache_downloads"] == 1
+    assert report["counters"]["rows_written"] == 6
+    totals = {}
+    for name in ("model_a", "model_b"):
+        df = pd.read_csv(tmp_path / "out" / name / "chatgpt_portfolio_update.csv")
+        totals[name] = df[df["Ticker"] == "TOTAL"].iloc[-1]["Total Equity"]
+    assert totals == {"model_a": pytest.approx(109.0), "model_b": pytest.approx(104.0)}
@@ -0,0 +1,106 @@
+import pathlib
+import sys
+from datetime import datetime
+
+import pandas as pd
+import pytest
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+
+from src import providers, watcher
+from src.portfolio import Portfolio, ledger
+from src.portfolio.ledger import Ledger, Position
+from src.providers import PriceProvider
+
+
+class _Quotes(PriceProvider):
+    def __init__(self, prices):
+        self.prices = prices
+        self.calls = []
+
+    def download(self, tickers, **kwargs):
+        raise AssertionError("quotes are served without downloading")
+
+    def quotes(self, tickers):
+        self.calls.append(list(tickers))
+        return {t: self.prices[t] for t in tickers if t in self.prices}
+
+
+def _watcher(positions):
+    w = watcher.StopLossWatcher()
+    w._book = Ledger({p.ticker: p for p in positions}, cash=0.0)
+    w._positions = dict(w._book.positions)
+    return w
+
+
+def test_breached_only_pops_positions_at_or_below_stop():
+    w = _watcher([Position("AAA", 10, 5.0, 4.0), Position("BBB", 10, 5.0, 2.0)])
+
+    assert w.breached({"AAA": 4.5, "BBB": 3.0}) == []
+    assert w.breached({"AAA": 4.2}) == []
+    assert w.breached({"AAA": 4.0, "BBB": 3.0}) == ["AAA"]
+    assert w.tickers == ["BBB"]
+    # A stale key for AAA left in the heap is never reported again
+    assert w.breached({"BBB": 2.5}) == []
+
+
+def test_poll_sells_breached_positions(tmp_path, monkeypatch):
+    ledger.clear()
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "Scripts and CSV Files").mkdir()
+    today = Portfolio().today
+    rows = pd.DataFrame({
+        "Date": [today] * 5,
+        "Ticker": ["AAA", "BBB", "CCC", "DDD", "TOTAL"],
+        "Shares": [10, 5, 2, 1, ""],
+        "Cost Basis": [5.0, 2.0, 3.0, 6.0, ""],
+        "Stop Loss": [4.0, 1.0, 2.5, 0.0, ""],
+        "Current Price": [4.5, 2.4, 2.4, 7.0, ""],
+        "Total Value": [45.0, 12.0, 4.8, 7.0, 64.0],
+        "PnL": [-5.0, 2.0, -1.2, 1.0, -2.0],
+        "Action": ["HOLD", "HOLD", "SELL - Stop Loss Triggered", "HOLD", ""],
+        "Cash Balance": ["", "", "", "", 20.0],
+        "Total Equity": ["", "", "", "", 84.0],
+    })
+    rows.to_csv(ledger.PORTFOLIO_FILE, index=False)
+    source = _Quotes({"AAA": 3.9, "BBB": 2.5})
+    monkeypatch.setattr(providers, "_provider", source)
+
+    sold = []
+    monkeypatch.setattr(Portfolio, "log_sells", lambda self, sales: sold.extend(sales))
+
+    def no_repricing(self, *args):
+        raise AssertionError("the watcher writes the day from its quotes")
+    monkeypatch.setattr(Portfolio, "process", no_repricing)
+
+    w = watcher.StopLossWatcher()
+    assert w.poll() == ["AAA"]
+    assert sold == [("AAA", 10, 3.9, 5.0, -11.0, watcher.REASON)]
+
+    # The earlier sale is kept, BBB is priced at its quote, DDD (not
+    # watched) at its written price, and the intraday sale gets its own row
+    day = pd.read_csv(ledger.PORTFOLIO_FILE).set_index("Ticker")
+    assert list(day.index) == ["CCC", "BBB", "DDD", "AAA", "TOTAL"]
+    assert list(day["Action"].iloc[:4]) == ["SELL - Stop Loss Triggered", "HOLD", "HOLD", watcher.REASON]
+    assert day.loc["BBB", "Current Price"] == 2.5
+    assert day.loc["DDD", "Current Price"] == 7.0
+    assert day.loc["AAA", "Current Price"] == 3.9
+    assert day.loc["TOTAL", "Cash Balance"] == pytest.approx(59.0)
+    assert day.loc["TOTAL", "Total Equity"] == pytest.approx(78.5)
+
+    book = ledger.get_ledger(ledger.PORTFOLIO_FILE)
+    assert sorted(book.positions) == ["BBB", "DDD"]
+    assert book.cash == pytest.approx(59.0)
+
+    # Only the remaining position is quoted on the next tick
+    assert w.poll() == []
+    assert source.calls[-1] == ["BBB"]
+
+
+def test_market_open():
+    tz = watcher._MARKET_TZ
+    assert watcher.market_open(datetime(2025, 8, 1, 10, 5, tzinfo=tz))
+    assert not watcher.market_open(datetime(2025, 8, 1, 16, 0, tzinfo=tz))
+    assert not watcher.market_open(datetime(2025, 8, 2, 11, 0, tzinfo=tz))
+    # Independence Day falls on a Friday
+    assert not watcher.market_open(datetime(2025, 7, 4, 11, 0, tzinfo=tz))